@@ -2,13 +2,14 @@ import MetaTrader5 as mt5
 import pandas as pd
 from datetime import datetime, timedelta
 import os
-from ta.trend import SMAIndicator
-from ta.momentum import RSIIndicator
 import xgboost as xgb
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 import time
 import schedule
+from descargar_historial import descargar_por_bloques
+from construir_dataset import construir_dataset, es_direccional
+from ajustar_modelos import cargar_manifest
 
 # Configuración de símbolos y temporalidades
 SYMBOL_CONFIG = {
@@ -18,6 +19,7 @@ SYMBOL_CONFIG = {
 
 DATA_FOLDER = "market_data"
 MODEL_FOLDER = "models"
+TARGET_LABEL = "next_up"  # Etiqueta de dirección de construir_dataset: next_up o up_N (autoTrade lee 1 = BUY, 0 = SELL)
 
 TIMEFRAME_MAP = {
     "M1": mt5.TIMEFRAME_M1,
@@ -53,36 +55,40 @@ def actualizar_datos_y_modelo(symbol, tf_name):
         last_time = datetime(2024, 1, 1)
 
     now = datetime.now()
-    rates = mt5.copy_rates_range(symbol, timeframe, last_time + timedelta(seconds=1), now)
+    # Descargar por bloques para que los rangos grandes no se corten ni excedan el tiempo de espera
+    df_new = descargar_por_bloques(symbol, tf_name, last_time + timedelta(seconds=1), now)
 
-    if rates is None or len(rates) == 0:
+    if df_new.empty:
         print(f"⏳ No hay nuevas velas para {symbol} ({tf_name})")
         mt5.shutdown()
         return
 
-    df_new = pd.DataFrame(rates)
-    df_new['time'] = pd.to_datetime(df_new['time'], unit='s')
-
     df_combined = pd.concat([df_old, df_new], ignore_index=True).drop_duplicates(subset='time')
     os.makedirs(DATA_FOLDER, exist_ok=True)
     df_combined.to_csv(file_path, index=False)
     print(f"✅ Datos actualizados: {symbol} ({tf_name}) | Nuevas velas: {len(df_new)}")
 
-    # Reentrenar modelo
-    df = df_combined.copy()
-    df['sma_14'] = SMAIndicator(close=df['close'], window=14).sma_indicator()
-    df['rsi_14'] = RSIIndicator(close=df['close'], window=14).rsi()
-    df['future_close'] = df['close'].shift(-1)
-    df['target'] = (df['future_close'] > df['close']).astype(int)
-    df.dropna(inplace=True)
-
-    features = ['open', 'high', 'low', 'close', 'tick_volume', 'sma_14', 'rsi_14']
-    X = df[features]
-    y = df['target']
+    # Reentrenar modelo con la etiqueta configurada (ver construir_dataset)
+    point = mt5.symbol_info(symbol).point
+    X, etiquetas, _ = construir_dataset(symbol, tf_name, point, df=df_combined)
+    # Mejor configuración encontrada por ajustar_modelos, si existe
+    ajuste = cargar_manifest().get(f"{symbol}_{tf_name}", {})
+    target = ajuste.get("target", TARGET_LABEL)
+    if not es_direccional(target):
+        print(f"❌ La etiqueta '{target}' no es de dirección (next_up, up_N); autoTrade leería su 0 como SELL. Modelo no reentrenado.")
+        mt5.shutdown()
+        return
+    validas = etiquetas[target].notna()
+    X = X[validas]
+    y = etiquetas.loc[validas, target].astype(int)
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
 
-    model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
+    if ajuste:
+        print(f"⚙️ Usando configuración ajustada ({ajuste['fecha']}): {ajuste['params']}")
+        model = xgb.XGBClassifier(eval_metric='logloss', **ajuste["params"])
+    else:
+        model = xgb.XGBClassifier(use_label_encoder=False, eval_metric='logloss')
     model.fit(X_train, y_train)
 
     y_pred = model.predict(X_test)
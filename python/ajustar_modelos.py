@@ -0,0 +1,184 @@
+# Ajuste de hiperparámetros de los modelos XGBoost con validación walk-forward purgada.
+#
+# - Los folds son ventanas de entrenamiento crecientes seguidas de un bloque de prueba; se
+#   purgan las últimas velas de entrenamiento cuya etiqueta mira dentro del bloque de prueba.
+# - Las matrices de cada fold se guardan una vez en disco (.npy) y los procesos del pool las
+#   abren con memmap, sin copiarlas ni serializarlas por tarea.
+# - Cada combinación (candidato, fold) se entrena en paralelo con tree_method="hist" y
+#   early stopping sobre el final del tramo de entrenamiento, purgado igual que la prueba.
+# - La mejor configuración por (símbolo, temporalidad) se escribe en MANIFEST_FILE, que
+#   actualizar_datos_y_modelo lee al reentrenar.
+#
+# Uso: python ajustar_modelos.py
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+from construir_dataset import construir_dataset, es_direccional, HORIZONTE_BARRERA, HORIZONTES
+
+SYMBOL_CONFIG = {
+    "BTCUSDm": "M5",
+    "XAUUSDm": "M5"
+}
+POINTS = {"BTCUSDm": 0.01, "XAUUSDm": 0.001}  # Para las etiquetas en puntos, sin conectar a MT5
+
+MODEL_FOLDER = "models"
+MANIFEST_FILE = f"{MODEL_FOLDER}/manifest.json"
+FOLDS_FOLDER = "datasets/folds"
+TARGET_LABEL = "next_up"
+
+NUMERO_DE_FOLDS = 5
+EMBARGO = 10  # velas adicionales descartadas tras la purga
+FRACCION_VALIDACION = 0.1  # final del entrenamiento usado para early stopping
+NUMERO_DE_CANDIDATOS = 20
+MAX_PROCESOS = os.cpu_count()
+SEMILLA = 42
+
+ESPACIO_BUSQUEDA = {
+    "max_depth": [3, 4, 5, 6, 8],
+    "learning_rate": [0.01, 0.03, 0.05, 0.1],
+    "subsample": [0.6, 0.8, 1.0],
+    "colsample_bytree": [0.6, 0.8, 1.0],
+    "min_child_weight": [1, 5, 10],
+    "reg_lambda": [0.5, 1.0, 5.0],
+}
+PARAMETROS_FIJOS = {
+    "tree_method": "hist",
+    "n_estimators": 2000,
+    "early_stopping_rounds": 50,
+    "eval_metric": "logloss",
+    "n_jobs": 1,  # El paralelismo está en el pool de procesos
+}
+
+
+def horizonte_etiqueta(etiqueta):
+    # Cuántas velas hacia adelante mira la etiqueta (para la purga)
+    if etiqueta.startswith("tb_"):
+        return HORIZONTE_BARRERA
+    for h in sorted(HORIZONTES, reverse=True):
+        if etiqueta.endswith(f"_{h}"):
+            return h
+    return 1
+
+# ===============================
+# Folds walk-forward purgados
+# ===============================
+def folds_walk_forward(n, numero_de_folds, purga):
+    # Índices (entrenamiento, validación, prueba) de cada fold
+    bloque = n // (numero_de_folds + 1)
+    folds = []
+    for k in range(1, numero_de_folds + 1):
+        inicio_prueba = k * bloque
+        fin_prueba = n if k == numero_de_folds else inicio_prueba + bloque
+        fin_entrenamiento = inicio_prueba - purga - EMBARGO
+        inicio_validacion = int(fin_entrenamiento * (1 - FRACCION_VALIDACION))
+        # También se purga entre entrenamiento y validación: el early stopping no debe ver
+        # velas cuyas etiquetas ya están en el entrenamiento
+        fin_ajuste = inicio_validacion - purga
+        folds.append(((0, fin_ajuste), (inicio_validacion, fin_entrenamiento), (inicio_prueba, fin_prueba)))
+    return folds
+
+
+def guardar_folds(symbol, tf_name, etiqueta):
+    # Guardar X e y una sola vez; los folds son rangos contiguos sobre estas matrices
+    X, etiquetas, _ = construir_dataset(symbol, tf_name, POINTS[symbol])
+    validas = etiquetas[etiqueta].notna().to_numpy()
+    X = X.to_numpy(dtype=np.float32)[validas]
+    y = (etiquetas[etiqueta].to_numpy()[validas] > 0).astype(np.int8)
+
+    carpeta = f"{FOLDS_FOLDER}/{symbol}_{tf_name}_{etiqueta}"
+    os.makedirs(carpeta, exist_ok=True)
+    np.save(f"{carpeta}/X.npy", X)
+    np.save(f"{carpeta}/y.npy", y)
+    return carpeta, folds_walk_forward(len(y), NUMERO_DE_FOLDS, horizonte_etiqueta(etiqueta))
+
+# ===============================
+# Tarea del pool: un candidato en un fold
+# ===============================
+def evaluar(carpeta, fold, parametros):
+    X = np.load(f"{carpeta}/X.npy", mmap_mode="r")
+    y = np.load(f"{carpeta}/y.npy", mmap_mode="r")
+    (a, b), (c, d), (e, f) = fold
+
+    modelo = xgb.XGBClassifier(**PARAMETROS_FIJOS, **parametros)
+    modelo.fit(X[a:b], y[a:b], eval_set=[(X[c:d], y[c:d])], verbose=False)
+    proba = modelo.predict_proba(X[e:f])[:, 1]
+    y_prueba = y[e:f]
+    return {
+        "logloss": log_loss(y_prueba, proba, labels=[0, 1]),
+        "accuracy": accuracy_score(y_prueba, proba > 0.5),
+        "auc": roc_auc_score(y_prueba, proba) if len(np.unique(y_prueba)) > 1 else float("nan"),
+        "best_iteration": modelo.best_iteration,
+    }
+
+# ===============================
+# Búsqueda
+# ===============================
+def candidatos(numero, semilla=SEMILLA):
+    rng = random.Random(semilla)
+    return [{nombre: rng.choice(valores) for nombre, valores in ESPACIO_BUSQUEDA.items()} for _ in range(numero)]
+
+
+def ajustar(symbol, tf_name, etiqueta=TARGET_LABEL, procesos=MAX_PROCESOS):
+    carpeta, folds = guardar_folds(symbol, tf_name, etiqueta)
+    lista = candidatos(NUMERO_DE_CANDIDATOS)
+    print(f"🔍 {symbol} ({tf_name}): {len(lista)} candidatos x {len(folds)} folds, etiqueta {etiqueta}")
+
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        futuros = {(i, j): pool.submit(evaluar, carpeta, fold, parametros)
+                   for i, parametros in enumerate(lista) for j, fold in enumerate(folds)}
+        resultados = {clave: futuro.result() for clave, futuro in futuros.items()}
+
+    resumen = []
+    for i, parametros in enumerate(lista):
+        metricas = [resultados[(i, j)] for j in range(len(folds))]
+        resumen.append({
+            "params": parametros,
+            "logloss": float(np.mean([m["logloss"] for m in metricas])),
+            "accuracy": float(np.mean([m["accuracy"] for m in metricas])),
+            "auc": float(np.nanmean([m["auc"] for m in metricas])),
+            "n_estimators": int(np.median([m["best_iteration"] for m in metricas])) + 1,
+        })
+    mejor = min(resumen, key=lambda r: r["logloss"])
+    print(f"🏆 {symbol} ({tf_name}): logloss {mejor['logloss']:.4f} | precisión {mejor['accuracy']:.2%} | AUC {mejor['auc']:.3f}")
+    return mejor, etiqueta
+
+# ===============================
+# Manifiesto de configuraciones
+# ===============================
+def cargar_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def guardar_en_manifest(symbol, tf_name, mejor, etiqueta):
+    # El manifiesto define el modelo con el que opera autoTrade: solo etiquetas de dirección
+    if not es_direccional(etiqueta):
+        raise ValueError(f"La etiqueta '{etiqueta}' no es de dirección (next_up, up_N) y no puede ir al manifiesto")
+    manifest = cargar_manifest()
+    manifest[f"{symbol}_{tf_name}"] = {
+        "target": etiqueta,
+        "params": {**mejor["params"], "n_estimators": mejor["n_estimators"], "tree_method": "hist"},
+        "cv": {"logloss": mejor["logloss"], "accuracy": mejor["accuracy"], "auc": mejor["auc"]},
+        "fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    os.makedirs(MODEL_FOLDER, exist_ok=True)
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+if __name__ == "__main__":
+    for symbol, tf in SYMBOL_CONFIG.items():
+        mejor, etiqueta = ajustar(symbol, tf)
+        guardar_en_manifest(symbol, tf, mejor, etiqueta)
+        print(f"💾 Configuración guardada en {MANIFEST_FILE}")
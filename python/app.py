@@ -1,8 +1,14 @@
 from flask import Flask, request, jsonify
-from mt5_bridge import send_order_for_symbols
+from execution_router import ExecutionRouter, cargar_cuentas
+
+# MetaTrader5 y mt5_bridge se importan al usarse: con el router solo los cargan los procesos
+# trabajadores, y el webhook queda disponible sin esperar esas importaciones.
 
 app = Flask(__name__)
 
+# Router multi-cuenta (solo si hay cuentas configuradas en accounts.json)
+router = None
+
 # Lista oficial de símbolos válidos
 valid_symbols = {
     "XAUUSD": "XAUUSDm",
@@ -38,7 +44,11 @@ def webhook():
         tf = data.get("tf", "")
 
         # Solo enviar orden al símbolo mapeado
-        result = send_order_for_symbols(signal, entry, sl, tp, tf, symbol=mapped_symbol)
+        if router:
+            result = router.enviar(signal, entry, sl, tp, tf, symbol=mapped_symbol)
+        else:
+            from mt5_bridge import send_order_for_symbols
+            result = send_order_for_symbols(signal, entry, sl, tp, tf, symbol=mapped_symbol)
 
         return jsonify({'status': 'ok', 'result': str(result)})
 
@@ -46,4 +56,21 @@ def webhook():
         return jsonify({'error': f'Error al procesar la orden: {str(e)}'}), 500
 
 if __name__ == '__main__':
-    app.run(port=5000)
+    cuentas = cargar_cuentas()
+    if cuentas:
+        router = ExecutionRouter(cuentas)
+        router.iniciar()
+    else:
+        import MetaTrader5 as mt5
+        import mt5_bridge
+        if mt5.initialize():
+            # Una sola cuenta: conexión persistente vigilada por el monitor de equity
+            mt5_bridge.iniciar_monitor()
+    try:
+        app.run(port=5000)
+    finally:
+        if router:
+            router.detener()
+        elif mt5_bridge.equity_monitor is not None:
+            mt5_bridge.detener_monitor()
+            mt5.shutdown()
@@ -4,21 +4,21 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 from datetime import datetime
-from ta.trend import SMAIndicator
-from ta.momentum import RSIIndicator
-import xgboost as xgb
-from colorama import init, Fore
 import schedule
 import time
+import sys
 import logging
+from tick_feed import TickFeed
+from bar_cache import BarCache
+from risk_engine import RiskEngine
+from symbol_constraints import get_constraints, adjust_stops, offset_stops
+from equity_monitor import EquityMonitor
+from execution_stats import send_order, get_deviation, get_filling_mode
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Initialize colorama
-init(autoreset=True)
-
 # Configuration
 SYMBOL_CONFIG = {
     "BTCUSDm": "M5",
@@ -37,8 +37,19 @@ TIMEFRAME_MAP = {
 }
 
 RISK_PER_TRADE = 0.01  # 1% of account balance
+MAX_OPEN_POSITIONS = 4
+MAGIC_NUMBER = 123456  # only positions opened with it count towards MAX_OPEN_POSITIONS
+SCALPING_SL_POINTS = 150
+SCALPING_TP_POINTS = 300
 MIN_CONFIDENCE = 0.75
-INITIAL_BALANCE = None
+MIN_EQUITY_RATIO = 0.25  # Stop trading below 25% of the initial balance
+ANALYSIS_BARS = 100
+WARM_STATE_FILE = "warm_state/autotrade_bars.npz"
+
+BAR_CACHE = BarCache()
+MODELS = {}  # model path -> (mtime, model), loaded once per process
+RISK_ENGINE = RiskEngine(risk_per_trade=RISK_PER_TRADE, max_positions=MAX_OPEN_POSITIONS, magic=MAGIC_NUMBER)
+EQUITY_MONITOR = EquityMonitor(state_file="equity_state_autotrade.json", min_equity_ratio=MIN_EQUITY_RATIO)
 
 # Ensure models folder exists
 Path(MODEL_FOLDER).mkdir(exist_ok=True)
@@ -46,6 +57,9 @@ Path(MODEL_FOLDER).mkdir(exist_ok=True)
 
 def calculate_indicators(df):
     """Calculate technical indicators."""
+    from ta.trend import SMAIndicator
+    from ta.momentum import RSIIndicator
+
     df['sma_14'] = SMAIndicator(close=df['close'], window=14).sma_indicator()
     df['rsi_14'] = RSIIndicator(close=df['close'], window=14).rsi()
     df['ema_fast'] = df['close'].ewm(span=5).mean()
@@ -54,6 +68,36 @@ def calculate_indicators(df):
     return df
 
 
+def get_model(symbol, tf_name):
+    """Return the cached model, reloading it only when the file on disk changes."""
+    model_path = Path(f"{MODEL_FOLDER}/{symbol}_{tf_name}.json")
+    if not model_path.exists():
+        return None
+    mtime = model_path.stat().st_mtime
+    cached = MODELS.get(model_path)
+    if cached is None or cached[0] != mtime:
+        import xgboost as xgb
+        model = xgb.XGBClassifier()
+        model.load_model(model_path)
+        MODELS[model_path] = cached = (mtime, model)
+    return cached[1]
+
+
+def restore_warm_state():
+    """Restore bar buffers from the last snapshot and preload models, so the first decision is immediate."""
+    restored = BAR_CACHE.load(WARM_STATE_FILE)
+    for symbol, tf_name in SYMBOL_CONFIG.items():
+        get_model(symbol, tf_name)
+    logger.info(f"Warm state restored: {restored} bar buffers, {len(MODELS)} models")
+
+
+def save_warm_state():
+    try:
+        BAR_CACHE.save(WARM_STATE_FILE)
+    except OSError:
+        logger.exception("Failed to save warm state")
+
+
 def detect_zone(price, support, resistance):
     """Detect price zone."""
     if price <= support * 1.005:
@@ -103,54 +147,8 @@ def strategy_trend(df, latest):
     return direction, is_impulse
 
 
-def run_prediction(symbol, tf_name):
-    """Run prediction and execute trades."""
-    global INITIAL_BALANCE
-    timeframe = TIMEFRAME_MAP[tf_name]
-    now = datetime.now()
-
-    if not mt5.initialize():
-        logger.error(f"Failed to initialize MT5 for {symbol}")
-        return
-
-    account_info = mt5.account_info()
-    if account_info is None:
-        logger.error("Failed to fetch account info")
-        mt5.shutdown()
-        return
-
-    balance = account_info.balance
-    if INITIAL_BALANCE is None:
-        INITIAL_BALANCE = balance
-
-    logger.info(f"Analyzing {symbol} ({tf_name}) | Balance: {balance:.2f} USD")
-
-    if balance < INITIAL_BALANCE * 0.25:
-        logger.error("Account balance below 25% of initial balance. Stopping trading.")
-        mt5.shutdown()
-        return
-
-    # Load model
-    model_path = Path(f"{MODEL_FOLDER}/{symbol}_{tf_name}.json")
-    if not model_path.exists():
-        logger.error(f"Model not found: {model_path}")
-        mt5.shutdown()
-        return
-
-    model = xgb.XGBClassifier()
-    model.load_model(model_path)
-
-    # Fetch historical data
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, 100)
-    if rates is None or len(rates) < 20:
-        logger.error(f"Insufficient data for {symbol}")
-        mt5.shutdown()
-        return
-
-    df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
-    df = calculate_indicators(df)
-
+def analyze(model, df, timeframe, min_confidence=MIN_CONFIDENCE):
+    """Model and rule-based signals for the last bar of a frame with indicators."""
     latest = df.iloc[-1]
     X_live = pd.DataFrame([{col: latest[col] for col in ['open', 'high', 'low', 'close', 'tick_volume']}])
     X_live['sma_14'] = latest['sma_14']
@@ -169,10 +167,128 @@ def run_prediction(symbol, tf_name):
     else:
         direction, is_impulse = strategy_trend(df, latest)
 
-    zone = detect_zone(price, support, resistance)
+    return {
+        "latest": latest,
+        "price": price,
+        "support": support,
+        "resistance": resistance,
+        "model_direction": model_direction,
+        "confidence": confidence,
+        "direction": direction,
+        "is_impulse": is_impulse,
+        "zone": detect_zone(price, support, resistance),
+        "trade": bool(direction) and (timeframe < mt5.TIMEFRAME_M15 or is_impulse) and confidence > min_confidence,
+    }
+
+
+def compute_stops(constraints, timeframe, direction, price, support, resistance):
+    """SL/TP at support/resistance for trend timeframes, fixed point offsets for scalping."""
+    if timeframe >= mt5.TIMEFRAME_M15:
+        tp = resistance if direction == "BUY" else support
+        sl = support if direction == "BUY" else resistance
+
+        # Adjust SL/TP if too close
+        return adjust_stops(constraints, direction, price, sl, tp)
+    return offset_stops(constraints, direction, price, SCALPING_SL_POINTS, SCALPING_TP_POINTS)
+
+
+def place_order(symbol, direction, price, sl, tp, balance, constraints):
+    """Size a market order by risk, check the circuit breaker and portfolio limits, and send it."""
+    # Calculate position size based on risk and check portfolio limits
+    if not EQUITY_MONITOR.trading_allowed:
+        logger.error(f"Order skipped for {symbol}: circuit breaker tripped")
+        return None
+    RISK_ENGINE.sync()
+    position_size = RISK_ENGINE.size_order(symbol, balance, price, sl)
+    allowed, reason = RISK_ENGINE.can_open(symbol, position_size)
+    if not allowed:
+        logger.warning(f"Order skipped for {symbol}: {reason}")
+        return None
+
+    request = {
+        "action": mt5.TRADE_ACTION_DEAL,
+        "symbol": symbol,
+        "volume": position_size,
+        "type": mt5.ORDER_TYPE_BUY if direction == "BUY" else mt5.ORDER_TYPE_SELL,
+        "price": price,
+        "sl": sl,
+        "tp": tp,
+        "deviation": get_deviation(symbol),
+        "magic": MAGIC_NUMBER,
+        "type_time": mt5.ORDER_TIME_GTC,
+        "type_filling": get_filling_mode(symbol, constraints),
+    }
+
+    result = send_order(request)
+    if result is None:
+        logger.error(f"Order failed: no response from MT5 ({mt5.last_error()})")
+    elif result.retcode == mt5.TRADE_RETCODE_DONE:
+        RISK_ENGINE.record_fill(symbol, result.volume, result.order)
+        logger.info(f"Order executed: {direction} {position_size} lots @ {price:.2f} | SL: {sl:.2f} | TP: {tp:.2f}")
+    else:
+        logger.error(f"Order failed: {result.retcode} - {result.comment}")
+    return result
+
 
-    logger.info(f"ML Signal: {model_direction} | Confidence: {confidence:.2%} | Strategy Direction: {direction} | Impulse: {is_impulse}")
-    logger.info(f"Zone: {zone} | Price: {price:.2f} | Support: {support:.2f} | Resistance: {resistance:.2f}")
+def merge_closed_bar(symbol, timeframe, bar):
+    """Add a bar aggregated from ticks to the cache when the terminal has not published it yet."""
+    constraints = get_constraints(symbol)
+    point = constraints["point"] if constraints else 0
+    # The aggregator's spread is in price units; the cache stores points like copy_rates
+    BAR_CACHE.add_bar(symbol, timeframe, {**bar, "spread": round(bar["spread"] / point) if point else 0})
+
+
+def evaluate_symbol(symbol, tf_name, bar=None):
+    """Run prediction and execute trades on an already initialized MT5 connection.
+
+    With bar (a bar closed by the tick feed) the analysis ends at that bar, whether or not the
+    terminal has already opened the next one. The bar is merged into the cache first, so the
+    decision uses it even before the terminal serves it through copy_rates.
+    """
+    timeframe = TIMEFRAME_MAP[tf_name]
+    now = datetime.now()
+
+    if not EQUITY_MONITOR.trading_allowed:
+        logger.error(f"Trading halted by circuit breaker: {EQUITY_MONITOR.reason}")
+        return
+
+    # The monitor thread keeps the latest balance; only query the account before its first sample
+    balance = EQUITY_MONITOR.balance
+    if balance is None:
+        account_info = mt5.account_info()
+        if account_info is None:
+            logger.error("Failed to fetch account info")
+            return
+        balance = account_info.balance
+
+    logger.info(f"Analyzing {symbol} ({tf_name}) | Balance: {balance:.2f} USD")
+
+    model = get_model(symbol, tf_name)
+    if model is None:
+        logger.error(f"Model not found: {MODEL_FOLDER}/{symbol}_{tf_name}.json")
+        return
+
+    # Fetch only the bars that are new since the previous cycle
+    if BAR_CACHE.update(symbol, timeframe) is None:
+        logger.error(f"Insufficient data for {symbol}")
+        return
+    if bar is not None:
+        merge_closed_bar(symbol, timeframe, bar)
+    df = BAR_CACHE.frame(symbol, timeframe, ANALYSIS_BARS, until=bar["time"] if bar is not None else None)
+    if len(df) < 20:
+        logger.error(f"Insufficient data for {symbol}")
+        return
+
+    df = calculate_indicators(df)
+    analysis = analyze(model, df, timeframe)
+    latest = analysis["latest"]
+    price = analysis["price"]
+    support = analysis["support"]
+    resistance = analysis["resistance"]
+    direction = analysis["direction"]
+
+    logger.info(f"ML Signal: {analysis['model_direction']} | Confidence: {analysis['confidence']:.2%} | Strategy Direction: {direction} | Impulse: {analysis['is_impulse']}")
+    logger.info(f"Zone: {analysis['zone']} | Price: {price:.2f} | Support: {support:.2f} | Resistance: {resistance:.2f}")
 
     # Log analysis
     Path("logs").mkdir(exist_ok=True)
@@ -184,78 +300,90 @@ def run_prediction(symbol, tf_name):
         writer.writerow([
             now.strftime('%Y-%m-%d %H:%M:%S'), price, support, resistance,
             round(latest['rsi_14'], 2), round(latest['sma_14'], 2),
-            is_impulse, zone, model_direction, round(confidence, 4)
+            analysis["is_impulse"], analysis["zone"], analysis["model_direction"], round(analysis["confidence"], 4)
         ])
 
     # Execute trade if conditions are met
-    if direction and (timeframe < mt5.TIMEFRAME_M15 or is_impulse) and confidence > MIN_CONFIDENCE:
+    if analysis["trade"]:
         tick = mt5.symbol_info_tick(symbol)
         if tick is None:
             logger.error(f"Failed to fetch tick data for {symbol}")
-            mt5.shutdown()
             return
 
-        order_type = mt5.ORDER_TYPE_BUY if direction == "BUY" else mt5.ORDER_TYPE_SELL
         price = tick.ask if direction == "BUY" else tick.bid
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
+        constraints = get_constraints(symbol)
+        if constraints is None:
             logger.error(f"Failed to fetch symbol info for {symbol}")
-            mt5.shutdown()
             return
 
-        point = symbol_info.point
-        stops_level = symbol_info.stops_level or 50
-        min_stop_distance = stops_level * point
-
-        if timeframe >= mt5.TIMEFRAME_M15:
-            tp = resistance if direction == "BUY" else support
-            sl = support if direction == "BUY" else resistance
-
-            # Adjust SL/TP if too close
-            if abs(tp - price) < min_stop_distance:
-                tp = price + min_stop_distance if direction == "BUY" else price - min_stop_distance
-            if abs(price - sl) < min_stop_distance:
-                sl = price - min_stop_distance if direction == "BUY" else price + min_stop_distance
-        else:
-            tp = price + max(300 * point, min_stop_distance) if direction == "BUY" else price - max(300 * point, min_stop_distance)
-            sl = price - max(150 * point, min_stop_distance) if direction == "BUY" else price + max(150 * point, min_stop_distance)
-
-        # Calculate position size based on risk
-        risk_amount = balance * RISK_PER_TRADE
-        position_size = risk_amount / abs(price - sl)
-
-        request = {
-            "action": mt5.TRADE_ACTION_DEAL,
-            "symbol": symbol,
-            "volume": round(position_size, 2),
-            "type": order_type,
-            "price": price,
-            "sl": sl,
-            "tp": tp,
-            "deviation": 20,
-            "magic": 123456,
-            "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
-        }
-
-        result = mt5.order_send(request)
-        if result.retcode == mt5.TRADE_RETCODE_DONE:
-            logger.info(f"Order executed: {direction} @ {price:.2f} | SL: {sl:.2f} | TP: {tp:.2f}")
-        else:
-            logger.error(f"Order failed: {result.retcode} - {result.comment}")
-
-    mt5.shutdown()
+        sl, tp = compute_stops(constraints, timeframe, direction, price, support, resistance)
+        place_order(symbol, direction, price, sl, tp, balance, constraints)
+
+
+def run_prediction(symbol, tf_name):
+    """Run prediction and execute trades."""
+    if not mt5.initialize():
+        logger.error(f"Failed to initialize MT5 for {symbol}")
+        return
+    try:
+        evaluate_symbol(symbol, tf_name)
+    finally:
+        mt5.shutdown()
 
 
 def start_loop():
-    """Start the trading loop."""
+    """Start the trading loop on one persistent connection, shared with the equity monitor."""
+    if not mt5.initialize():
+        logger.error("Failed to initialize MT5")
+        return
+    EQUITY_MONITOR.start()
+    restore_warm_state()
     for symbol, tf_name in SYMBOL_CONFIG.items():
-        schedule.every(5).minutes.do(lambda s=symbol, tf=tf_name: run_prediction(s, tf))
+        schedule.every(5).minutes.do(lambda s=symbol, tf=tf_name: evaluate_symbol(s, tf))
+    schedule.every(5).minutes.do(save_warm_state)
     logger.info("Auto-analysis started for all symbols and timeframes every 5 minutes.")
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    # Decide right away on the restored state instead of waiting for the first interval
+    schedule.run_all()
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+    finally:
+        save_warm_state()
+        EQUITY_MONITOR.stop()
+        mt5.shutdown()
+
+
+def on_bar_close(symbol, tf_name, bar):
+    """Evaluate the strategy as soon as a bar closes."""
+    logger.info(f"Bar closed: {symbol} ({tf_name}) @ {datetime.fromtimestamp(bar['time'])}")
+    evaluate_symbol(symbol, tf_name, bar=bar)
+    save_warm_state()
+
+
+def start_streaming():
+    """Start tick-driven trading: decisions are made on every bar close."""
+    if not mt5.initialize():
+        logger.error("Failed to initialize MT5")
+        return
+    feed = TickFeed({symbol: [tf_name] for symbol, tf_name in SYMBOL_CONFIG.items()})
+    feed.subscribe(on_bar_close)
+    EQUITY_MONITOR.start()
+    restore_warm_state()
+    logger.info("Tick streaming started for all symbols and timeframes.")
+    try:
+        feed.run()
+    finally:
+        save_warm_state()
+        EQUITY_MONITOR.stop()
+        mt5.shutdown()
 
 
 if __name__ == "__main__":
-    start_loop()
\ No newline at end of file
+    from colorama import init
+    init(autoreset=True)
+
+    if "--stream" in sys.argv:
+        start_streaming()
+    else:
+        start_loop()
\ No newline at end of file
@@ -0,0 +1,156 @@
+import MetaTrader5 as mt5
+import numpy as np
+import pandas as pd
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+BAR_DTYPE = np.dtype([
+    ("time", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("tick_volume", "i8"),
+    ("spread", "i4"),
+    ("real_volume", "i8"),
+])
+
+DEFAULT_CAPACITY = 500
+INITIAL_FETCH = 2  # forming bar + the one that just closed
+
+
+class BarRingBuffer:
+    """Preallocated bar history for one symbol/timeframe.
+
+    Every bar is written twice (at i and i + capacity) so that the last n bars
+    are always a contiguous slice and can be returned as a view without copying.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.data = np.zeros(2 * capacity, dtype=BAR_DTYPE)
+        self.count = 0
+        self.head = 0  # next write position in [0, capacity)
+
+    def last_time(self):
+        if self.count == 0:
+            return None
+        return int(self.data[self.head - 1 + self.capacity]["time"])
+
+    def push(self, bar):
+        self.data[self.head] = bar
+        self.data[self.head + self.capacity] = bar
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, bar):
+        last = (self.head - 1) % self.capacity
+        self.data[last] = bar
+        self.data[last + self.capacity] = bar
+
+    def merge(self, rates):
+        """Append bars newer than the last one stored; refresh the last one if it is returned again."""
+        last_time = self.last_time()
+        for bar in rates:
+            t = int(bar["time"])
+            if last_time is not None and t < last_time:
+                continue
+            if t == last_time:
+                self.replace_last(bar)
+            else:
+                self.push(bar)
+                last_time = t
+
+    def view(self, n=None, until=None):
+        """Zero-copy view of the last n bars (oldest first), optionally only those with time <= until."""
+        end = self.head + self.capacity
+        available = self.count
+        if until is not None:
+            times = self.data["time"][end - available:end]
+            available = int(np.searchsorted(times, until, side="right"))
+            end = end - self.count + available
+        n = available if n is None else min(n, available)
+        return self.data[end - n:end]
+
+
+class BarCache:
+    """Keeps one BarRingBuffer per (symbol, timeframe) and tops it up incrementally."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def update(self, symbol, timeframe):
+        """Fetch only the bars that are newer than the last one seen.
+
+        Returns the number fetched, or None when the terminal returned nothing; the buffer then
+        still holds the previous (possibly restored) bars, which callers must not trade on.
+        """
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None:
+            buffer = self.buffers[(symbol, timeframe)] = BarRingBuffer(self.capacity)
+
+        last_time = buffer.last_time()
+        count = self.capacity if last_time is None else INITIAL_FETCH
+        while True:
+            rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, count)
+            if rates is None or len(rates) == 0:
+                logger.error(f"Failed to fetch bars for {symbol}: {mt5.last_error()}")
+                return None
+            # Grow the request until it overlaps what is already cached
+            if last_time is None or rates[0]["time"] <= last_time or count >= self.capacity or len(rates) < count:
+                break
+            count = min(count * 2, self.capacity)
+
+        if last_time is not None and rates[0]["time"] > last_time:
+            # The cache is older than a full buffer (e.g. a stale snapshot): start over to avoid a gap
+            buffer = self.buffers[(symbol, timeframe)] = BarRingBuffer(self.capacity)
+        buffer.merge(rates)
+        return len(rates)
+
+    def add_bar(self, symbol, timeframe, bar):
+        """Append a bar built outside the terminal (e.g. from ticks) if it is newer than the cache.
+
+        A later update() replaces it with the terminal's version of the same bar.
+        """
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None:
+            return False
+        last_time = buffer.last_time()
+        if last_time is not None and bar["time"] <= last_time:
+            return False
+        buffer.push(tuple(bar[name] for name in BAR_DTYPE.names))
+        return True
+
+    def view(self, symbol, timeframe, n=None, until=None):
+        buffer = self.buffers.get((symbol, timeframe))
+        if buffer is None:
+            return np.zeros(0, dtype=BAR_DTYPE)
+        return buffer.view(n, until)
+
+    def frame(self, symbol, timeframe, n=None, until=None):
+        """DataFrame whose columns are backed by the cache (no copy of the bar data)."""
+        bars = self.view(symbol, timeframe, n, until)
+        return pd.DataFrame({name: bars[name] for name in BAR_DTYPE.names}, copy=False)
+
+    def save(self, path):
+        """Snapshot every buffer to an .npz file (written atomically)."""
+        arrays = {f"{symbol}|{timeframe}": buffer.view() for (symbol, timeframe), buffer in self.buffers.items()}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def load(self, path):
+        """Restore buffers saved with save(). The next update() only fetches bars newer than the snapshot."""
+        if not os.path.exists(path):
+            return 0
+        with np.load(path) as snapshot:
+            for key in snapshot.files:
+                symbol, timeframe = key.rsplit("|", 1)
+                buffer = self.buffers[(symbol, int(timeframe))] = BarRingBuffer(self.capacity)
+                buffer.merge(snapshot[key][-self.capacity:])
+        return len(self.buffers)
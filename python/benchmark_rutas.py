@@ -0,0 +1,99 @@
+# Benchmark de Dijkstra en mejorRuta.Grafo sobre grafos sintéticos de escala ciudad.
+# Compara la implementación original (copia del camino en cada relajación, dict de dicts)
+# con la actual (CSR con índices enteros y arreglos de predecesores) y con la capa
+# de aceleración de indiceRutas (bidireccional, ALT y árboles cacheados).
+#
+# Uso: python benchmark_rutas.py [numero_de_nodos] [numero_de_consultas]
+import heapq
+import random
+import sys
+import time
+
+from mejorRuta import Grafo
+from indiceRutas import IndiceRutas
+
+
+def dijkstra_original(vertices, inicio, fin):
+    # Implementación original de Grafo.dijkstra, conservada como referencia
+    distancia = {vertice: float('inf') for vertice in vertices}
+    distancia[inicio] = 0
+    cola = [(0, inicio, [])]
+    while cola:
+        distancia_actual, vertice_actual, camino = heapq.heappop(cola)
+        if distancia_actual > distancia[vertice_actual]:
+            continue
+        camino = camino + [vertice_actual]
+        if vertice_actual == fin:
+            return camino
+        for vecino, peso_arista in vertices[vertice_actual].items():
+            distancia_total = distancia_actual + peso_arista
+            if distancia_total < distancia[vecino]:
+                distancia[vecino] = distancia_total
+                heapq.heappush(cola, (distancia_total, vecino, camino))
+    return []
+
+
+def grafo_ciudad(numero_de_nodos, semilla=42):
+    # Cuadrícula de calles con pesos aleatorios y algunos atajos (avenidas) de largo alcance
+    rng = random.Random(semilla)
+    lado = int(numero_de_nodos ** 0.5)
+    grafo = Grafo()
+    for i in range(lado * lado):
+        grafo.agregar_vertice(f"estacion {i}")
+    for fila in range(lado):
+        for col in range(lado):
+            i = fila * lado + col
+            if col + 1 < lado:
+                grafo.agregar_arista(f"estacion {i}", f"estacion {i + 1}", rng.randint(1, 10))
+            if fila + 1 < lado:
+                grafo.agregar_arista(f"estacion {i}", f"estacion {i + lado}", rng.randint(1, 10))
+    for _ in range(lado * lado // 50):
+        a, b = rng.randrange(lado * lado), rng.randrange(lado * lado)
+        grafo.agregar_arista(f"estacion {a}", f"estacion {b}", rng.randint(20, 60))
+    return grafo
+
+
+def costo(grafo, camino):
+    return sum(grafo.vertices[a][b] for a, b in zip(camino, camino[1:]))
+
+
+def medir(nombre, funcion, consultas):
+    inicio = time.perf_counter()
+    caminos = [funcion(a, b) for a, b in consultas]
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<12} {duracion:8.2f} s total | {duracion / len(consultas) * 1e6:12.1f} µs/consulta")
+    return caminos
+
+
+if __name__ == "__main__":
+    numero_de_nodos = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    numero_de_consultas = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    t = time.perf_counter()
+    grafo = grafo_ciudad(numero_de_nodos)
+    print(f"Grafo: {len(grafo.vertices)} nodos construidos en {time.perf_counter() - t:.2f} s")
+    t = time.perf_counter()
+    grafo.construir_csr()
+    print(f"CSR construido en {time.perf_counter() - t:.2f} s")
+
+    rng = random.Random(7)
+    nombres = list(grafo.vertices)
+    consultas = [(rng.choice(nombres), rng.choice(nombres)) for _ in range(numero_de_consultas)]
+
+    originales = medir("original", lambda a, b: dijkstra_original(grafo.vertices, a, b), consultas)
+    nuevos = medir("csr", grafo.dijkstra, consultas)
+
+    indice = IndiceRutas(grafo)
+    bidireccionales = medir("bidirec.", lambda a, b: indice.bidireccional(grafo.indice[a], grafo.indice[b])[0], consultas)
+    t = time.perf_counter()
+    indice.preprocesar()
+    print(f"Índice ALT construido en {time.perf_counter() - t:.2f} s")
+    alts = medir("alt", lambda a, b: indice.alt(grafo.indice[a], grafo.indice[b])[0], consultas)
+    for a, _ in consultas:
+        indice.arbol(grafo.indice[a])
+    cacheados = medir("árbol LRU", lambda a, b: indice.ruta(a, b)[0], consultas)
+
+    # Los caminos pueden diferir en empates, pero el costo total debe coincidir
+    for caminos in zip(originales, nuevos, bidireccionales, alts, cacheados):
+        assert len({costo(grafo, camino) for camino in caminos}) == 1
+    print("✅ Mismos costos de ruta en todas las consultas")
@@ -3,6 +3,11 @@ import pandas as pd
 import datetime
 import time
 import os
+from risk_engine import RiskEngine
+from bar_cache import BarCache
+from symbol_constraints import get_constraints, adjust_stops
+from equity_monitor import EquityMonitor
+from execution_stats import send_order as enviar_orden, get_deviation, get_filling_mode
 
 # Configuración
 symbols = ["XAUUSDm"]
@@ -15,6 +20,14 @@ max_drawdown_pct = 60
 check_drawdown = False
 
 capital_log_file = "capital_log.csv"
+equity_state_file = "equity_state_bot.json"
+warm_state_file = "warm_state/bot_bars.npz"
+
+# Motor de riesgo: límites de cartera en O(1) por orden
+risk_engine = RiskEngine(max_positions=max_total_trades)
+
+# Velas en memoria: se restauran del último snapshot y solo se piden las nuevas
+bar_cache = BarCache()
 
 # Indicadores
 ema_short_length = 11
@@ -29,17 +42,23 @@ if not mt5.initialize():
     print("❌ Error al conectar con MetaTrader 5.")
     quit()
 
-account_info = mt5.account_info()
-initial_balance = account_info.balance
+# Monitor de equity: pico, drawdown y corte en segundo plano, persistidos entre reinicios
+equity_monitor = EquityMonitor(
+    state_file=equity_state_file,
+    min_equity_ratio=1 - max_drawdown_pct / 100 if check_drawdown else None,
+).start()
+initial_balance = equity_monitor.initial_balance
 print(f"✅ Balance inicial: {initial_balance:.2f} USD")
+print(f"♻️ Buffers de velas restaurados: {bar_cache.load(warm_state_file)}")
 
 if not os.path.exists(capital_log_file):
     with open(capital_log_file, 'w') as f:
         f.write("datetime,balance,equity,drawdown_percent\n")
 
 def get_data(symbol, timeframe, bars=100):
-    rates = mt5.copy_rates_from_pos(symbol, timeframe, 0, bars)
-    df = pd.DataFrame(rates)
+    if bar_cache.update(symbol, timeframe) is None:
+        return None
+    df = bar_cache.frame(symbol, timeframe, bars)
     df['time'] = pd.to_datetime(df['time'], unit='s')
     return df
 
@@ -70,26 +89,45 @@ def generate_signal(df):
 
 def send_order(symbol, signal_type, sl, tp):
     tick = mt5.symbol_info_tick(symbol)
+    if tick is None:
+        print(f"❌ [{symbol}] No se pudo obtener el precio actual.")
+        return
     order_type = mt5.ORDER_TYPE_BUY if signal_type == 'buy' else mt5.ORDER_TYPE_SELL
     price = tick.ask if signal_type == 'buy' else tick.bid
 
+    # Ajustar SL/TP a la distancia mínima del broker (restricciones cacheadas)
+    constraints = get_constraints(symbol)
+    if constraints is None:
+        print(f"❌ [{symbol}] No se pudo obtener la información del símbolo. Orden no enviada.")
+        return
+    sl, tp = adjust_stops(constraints, signal_type.upper(), price, sl, tp)
+
+    volume = risk_engine.normalize_volume(symbol, lot_size)
+    allowed, reason = risk_engine.can_open(symbol, volume)
+    if not allowed:
+        print(f"⚠️ [{symbol}] Orden no enviada: {reason}")
+        return
+
     request = {
         "action": mt5.TRADE_ACTION_DEAL,
         "symbol": symbol,
-        "volume": lot_size,
+        "volume": volume,
         "type": order_type,
         "price": price,
         "sl": sl,
         "tp": tp,
-        "deviation": 20,
+        "deviation": get_deviation(symbol),
         "magic": magic_number,
         "comment": f"AutoTrade {signal_type}",
         "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
+        "type_filling": get_filling_mode(symbol, constraints),
     }
 
-    result = mt5.order_send(request)
-    if result.retcode == mt5.TRADE_RETCODE_DONE:
+    result = enviar_orden(request)
+    if result is None:
+        print(f"❌ [{symbol}] Sin respuesta de MT5 al enviar orden: {mt5.last_error()}")
+    elif result.retcode == mt5.TRADE_RETCODE_DONE:
+        risk_engine.record_fill(symbol, result.volume, result.order)
         print(f"✅ [{symbol}] Orden {signal_type.upper()} enviada.")
     else:
         print(f"❌ [{symbol}] Error al enviar orden: {result.retcode}")
@@ -99,7 +137,16 @@ def close_position(position):
     volume = position.volume
     ticket = position.ticket
     order_type = mt5.ORDER_TYPE_SELL if position.type == mt5.POSITION_TYPE_BUY else mt5.ORDER_TYPE_BUY
-    price = mt5.symbol_info_tick(symbol).bid if order_type == mt5.ORDER_TYPE_BUY else mt5.symbol_info_tick(symbol).ask
+    tick = mt5.symbol_info_tick(symbol)
+    if tick is None:
+        print(f"❌ [{symbol}] No se pudo obtener el precio actual.")
+        return
+    # Se cierra al precio del lado de la orden de cierre: ask para comprar, bid para vender
+    price = tick.ask if order_type == mt5.ORDER_TYPE_BUY else tick.bid
+    constraints = get_constraints(symbol)
+    if constraints is None:
+        print(f"❌ [{symbol}] No se pudo obtener la información del símbolo.")
+        return
 
     request = {
         "action": mt5.TRADE_ACTION_DEAL,
@@ -108,27 +155,30 @@ def close_position(position):
         "type": order_type,
         "position": ticket,
         "price": price,
-        "deviation": 20,
+        "deviation": get_deviation(symbol),
         "magic": magic_number,
         "comment": "Cerrar por señal inversa",
         "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC,
+        "type_filling": get_filling_mode(symbol, constraints),
     }
 
-    result = mt5.order_send(request)
-    if result.retcode == mt5.TRADE_RETCODE_DONE:
+    result = enviar_orden(request)
+    if result is None:
+        print(f"❌ [{symbol}] Sin respuesta de MT5 al cerrar posición: {mt5.last_error()}")
+    elif result.retcode == mt5.TRADE_RETCODE_DONE:
+        risk_engine.record_close(ticket)
         print(f"🔁 [{symbol}] Posición cerrada por señal inversa.")
     else:
         print(f"❌ [{symbol}] Error al cerrar posición: {result.retcode}")
 
 def count_open_trades():
-    return len(mt5.positions_get())
+    return risk_engine.book.total_positions
 
 def log_capital():
-    info = mt5.account_info()
-    drawdown = 100 * (initial_balance - info.equity) / initial_balance
+    state = equity_monitor.state
+    drawdown = 100 * (initial_balance - state["equity"]) / initial_balance
     with open(capital_log_file, 'a') as f:
-        f.write(f"{datetime.datetime.now()},{info.balance:.2f},{info.equity:.2f},{drawdown:.2f}\n")
+        f.write(f"{datetime.datetime.now()},{state['balance']:.2f},{state['equity']:.2f},{drawdown:.2f}\n")
     return drawdown
 
 # Bucle de ejecución
@@ -137,10 +187,11 @@ while True:
 
     drawdown = log_capital()
 
-    if check_drawdown and drawdown >= max_drawdown_pct:
-        print(f"🚨 Drawdown crítico ({drawdown:.2f}%) - No se abrirán nuevas operaciones.")
+    if not equity_monitor.trading_allowed:
+        print(f"🚨 Drawdown crítico ({equity_monitor.reason}) - No se abrirán nuevas operaciones.")
     else:
         open_positions = mt5.positions_get()
+        risk_engine.sync(open_positions)
         positions_by_symbol = {sym: None for sym in symbols}
         for pos in open_positions:
             if pos.symbol in symbols:
@@ -187,6 +238,9 @@ while True:
             else:
                 print(f"[{symbol}] No hay señal clara.")
 
+    # Snapshot de las velas para que un reinicio no vuelva a descargar el historial
+    bar_cache.save(warm_state_file)
+
     print("⏳ Esperando 60 segundos...\n")
     time.sleep(execution_interval)
 
@@ -0,0 +1,151 @@
+# Constructor de datasets de entrenamiento con múltiples etiquetas.
+#
+# Calcula en una sola pasada vectorizada sobre todo el historial:
+# - next_up: cierre siguiente > cierre actual (la etiqueta original)
+# - ret_N / up_N: retorno a N velas y su dirección
+# - vol_N: retorno a N velas clasificado con umbral escalado por volatilidad (-1, 0, 1)
+# - tb_*: triple barrera (qué se toca primero: TP, SL o ninguna dentro del horizonte),
+#   con las salidas de run_prediction (scalping 300/150 puntos) y las del bot por ATR
+# Los resultados se cachean en DATASET_FOLDER y se reutilizan mientras no cambie el CSV
+# ni la configuración de etiquetas.
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from ta.trend import SMAIndicator
+from ta.momentum import RSIIndicator
+from ta.volatility import AverageTrueRange
+
+from descargar_historial import ruta_datos
+
+DATASET_FOLDER = "datasets"
+FEATURES = ['open', 'high', 'low', 'close', 'tick_volume', 'sma_14', 'rsi_14']
+
+# Configuración de etiquetas
+HORIZONTES = [1, 3, 5, 10, 20]
+VENTANA_VOLATILIDAD = 50
+UMBRAL_VOLATILIDAD = 0.5  # múltiplos de la desviación estándar esperada a N velas
+BARRERAS_PUNTOS = {"scalping": (300, 150)}  # nombre: (TP, SL) en puntos, como en run_prediction
+BARRERAS_ATR = {"atr": (3.0, 1.5)}  # nombre: (TP, SL) en múltiplos de ATR, como en el bot
+HORIZONTE_BARRERA = 48  # velas máximas para tocar una barrera
+
+
+def es_direccional(etiqueta):
+    # Etiquetas binarias de dirección (1 = sube, 0 = baja): las únicas que autoTrade puede
+    # interpretar como BUY/SELL. En vol_N y tb_* el 0 significa "plano" o "ninguna barrera".
+    return etiqueta == 'next_up' or (etiqueta.startswith('up_') and etiqueta[3:].isdigit())
+
+
+def calcular_features(df):
+    df = df.copy()
+    df['sma_14'] = SMAIndicator(close=df['close'], window=14).sma_indicator()
+    df['rsi_14'] = RSIIndicator(close=df['close'], window=14).rsi()
+    return df
+
+
+def primer_toque(high, low, close, tp_dist, sl_dist, horizonte, direccion):
+    # Triple barrera sin bucles: 1 = TP primero, -1 = SL primero, 0 = ninguna, NaN = sin futuro.
+    # Si TP y SL caen en la misma vela se asume SL (conservador).
+    n = len(close)
+    etiquetas = np.full(n, np.nan)
+    m = n - horizonte
+    if m <= 0:
+        return etiquetas
+    # Ventanas de las velas futuras t+1 .. t+horizonte
+    altos = sliding_window_view(high[1:], horizonte)[:m]
+    bajos = sliding_window_view(low[1:], horizonte)[:m]
+    precio = close[:m, None]
+    if direccion == "BUY":
+        toca_tp = altos >= precio + tp_dist[:m, None]
+        toca_sl = bajos <= precio - sl_dist[:m, None]
+    else:
+        toca_tp = bajos <= precio - tp_dist[:m, None]
+        toca_sl = altos >= precio + sl_dist[:m, None]
+    nunca = horizonte + 1
+    primer_tp = np.where(toca_tp.any(axis=1), toca_tp.argmax(axis=1), nunca)
+    primer_sl = np.where(toca_sl.any(axis=1), toca_sl.argmax(axis=1), nunca)
+    etiquetas[:m] = np.select([primer_sl <= primer_tp, primer_tp < primer_sl], [-1, 1], 0)
+    etiquetas[:m][(primer_tp == nunca) & (primer_sl == nunca)] = 0
+    return etiquetas
+
+
+def calcular_etiquetas(df, point):
+    close = df['close'].to_numpy(dtype=float)
+    high = df['high'].to_numpy(dtype=float)
+    low = df['low'].to_numpy(dtype=float)
+    n = len(close)
+    etiquetas = {}
+
+    siguiente = np.append(close[1:], np.nan)
+    etiquetas['next_up'] = np.where(np.isnan(siguiente), np.nan, siguiente > close)
+
+    retorno_1 = np.append(np.nan, close[1:] / close[:-1] - 1)
+    volatilidad = pd.Series(retorno_1).rolling(VENTANA_VOLATILIDAD).std().to_numpy()
+    for h in HORIZONTES:
+        futuro = np.full(n, np.nan)
+        futuro[:n - h] = close[h:]
+        retorno = futuro / close - 1
+        umbral = UMBRAL_VOLATILIDAD * volatilidad * np.sqrt(h)
+        etiquetas[f'ret_{h}'] = retorno
+        etiquetas[f'up_{h}'] = np.where(np.isnan(retorno), np.nan, retorno > 0)
+        etiquetas[f'vol_{h}'] = np.where(np.isnan(retorno) | np.isnan(umbral), np.nan,
+                                         np.sign(retorno) * (np.abs(retorno) > umbral))
+
+    for nombre, (tp, sl) in BARRERAS_PUNTOS.items():
+        tp_dist = np.full(n, tp * point)
+        sl_dist = np.full(n, sl * point)
+        for direccion in ("BUY", "SELL"):
+            etiquetas[f'tb_{nombre}_{direccion.lower()}'] = primer_toque(
+                high, low, close, tp_dist, sl_dist, HORIZONTE_BARRERA, direccion)
+
+    atr = AverageTrueRange(high=df['high'], low=df['low'], close=df['close'], window=14).average_true_range().to_numpy()
+    atr = np.where(atr > 0, atr, np.nan)  # ta rellena con 0 antes de tener la ventana completa
+    for nombre, (tp, sl) in BARRERAS_ATR.items():
+        for direccion in ("BUY", "SELL"):
+            tb = primer_toque(high, low, close, np.nan_to_num(atr * tp, nan=np.inf),
+                              np.nan_to_num(atr * sl, nan=np.inf), HORIZONTE_BARRERA, direccion)
+            tb[np.isnan(atr)] = np.nan
+            etiquetas[f'tb_{nombre}_{direccion.lower()}'] = tb
+
+    return pd.DataFrame(etiquetas, index=df.index).astype('float32')
+
+
+def clave_cache(file_path, point):
+    # Cambia si cambia el CSV o la configuración de features/etiquetas
+    estado = os.stat(file_path)
+    configuracion = [FEATURES, HORIZONTES, VENTANA_VOLATILIDAD, UMBRAL_VOLATILIDAD,
+                     BARRERAS_PUNTOS, BARRERAS_ATR, HORIZONTE_BARRERA, point,
+                     estado.st_size, estado.st_mtime_ns]
+    return hashlib.sha1(json.dumps(configuracion, sort_keys=True).encode()).hexdigest()
+
+
+def construir_dataset(symbol, tf_name, point, df=None, usar_cache=True):
+    # Devuelve (X, etiquetas, tiempos) alineados; las filas sin features completas se descartan.
+    # Cada etiqueta puede tener NaN al final del historial (sin futuro suficiente).
+    file_path = ruta_datos(symbol, tf_name)
+    cache_path = f"{DATASET_FOLDER}/{symbol}_{tf_name}.npz"
+    clave = clave_cache(file_path, point)
+
+    if usar_cache and os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as datos:
+            if str(datos['clave']) == clave:
+                X = pd.DataFrame(datos['X'], columns=FEATURES)
+                etiquetas = pd.DataFrame(datos['etiquetas'], columns=list(datos['nombres_etiquetas']))
+                return X, etiquetas, pd.to_datetime(datos['tiempos'])
+
+    if df is None:
+        df = pd.read_csv(file_path)
+    df = calcular_features(df)
+    etiquetas = calcular_etiquetas(df, point)
+    validas = df[FEATURES].notna().all(axis=1).to_numpy()
+    X = df.loc[validas, FEATURES].reset_index(drop=True)
+    etiquetas = etiquetas.loc[validas].reset_index(drop=True)
+    tiempos = pd.to_datetime(df.loc[validas, 'time']).reset_index(drop=True)
+
+    os.makedirs(DATASET_FOLDER, exist_ok=True)
+    np.savez(cache_path, clave=clave, X=X.to_numpy(dtype=float), etiquetas=etiquetas.to_numpy(),
+             nombres_etiquetas=np.array(list(etiquetas.columns), dtype=str), tiempos=tiempos.to_numpy(dtype='datetime64[s]'))
+    return X, etiquetas, tiempos
@@ -0,0 +1,245 @@
+# Descarga de historial por bloques, en paralelo y reanudable.
+#
+# - Cada rango se parte en bloques de BARRAS_POR_BLOQUE velas según la temporalidad, para que
+#   copy_rates_range nunca reciba un rango que se corte o exceda el tiempo de espera.
+# - Los bloques de todos los símbolos/temporalidades se reparten en un pool acotado de
+#   procesos (cada proceso mantiene su propia conexión a MT5).
+# - Cada bloque terminado se guarda como parte en disco y se anota en CHECKPOINT_FILE, así
+#   una ejecución interrumpida continúa donde quedó.
+# - Al final se buscan huecos frente al calendario de negociación esperado y se vuelven a
+#   pedir; los huecos sin datos en el servidor (cierres, feriados) se anotan y no se repiten.
+#
+# Uso: python descargar_historial.py
+import MetaTrader5 as mt5
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import glob
+import json
+import os
+
+# Configuración de símbolos y temporalidades a descargar
+BACKFILL_CONFIG = {
+    "BTCUSDm": ["M5", "M15", "H1"],
+    "XAUUSDm": ["M5", "M15", "H1"],
+}
+
+DATA_FOLDER = "market_data"
+PARTES_FOLDER = f"{DATA_FOLDER}/partes"
+CHECKPOINT_FILE = f"{DATA_FOLDER}/backfill_checkpoint.json"
+INICIO_HISTORIAL = datetime(2024, 1, 1)
+BARRAS_POR_BLOQUE = 20_000
+MAX_PROCESOS = 4
+
+# Símbolos que cotizan todos los días; el resto cierra sábado y domingo
+CALENDARIO_24X7 = {"BTCUSDm"}
+
+TIMEFRAME_MAP = {
+    "M1": mt5.TIMEFRAME_M1,
+    "M5": mt5.TIMEFRAME_M5,
+    "M15": mt5.TIMEFRAME_M15,
+    "M30": mt5.TIMEFRAME_M30,
+    "H1": mt5.TIMEFRAME_H1,
+    "H4": mt5.TIMEFRAME_H4,
+    "D1": mt5.TIMEFRAME_D1,
+}
+
+TIMEFRAME_SECONDS = {
+    "M1": 60,
+    "M5": 5 * 60,
+    "M15": 15 * 60,
+    "M30": 30 * 60,
+    "H1": 60 * 60,
+    "H4": 4 * 60 * 60,
+    "D1": 24 * 60 * 60,
+}
+
+
+def ruta_datos(symbol, tf_name):
+    return f"{DATA_FOLDER}/{symbol}_{tf_name}_2024-2025.csv"
+
+# ===============================
+# Bloques y descarga
+# ===============================
+def bloques(desde, hasta, tf_name):
+    # Partir [desde, hasta) en bloques alineados de BARRAS_POR_BLOQUE velas
+    paso = timedelta(seconds=TIMEFRAME_SECONDS[tf_name] * BARRAS_POR_BLOQUE)
+    inicio = desde
+    while inicio < hasta:
+        fin = min(inicio + paso, hasta)
+        yield inicio, fin
+        inicio = fin
+
+
+def descargar_bloque(symbol, tf_name, inicio, fin):
+    # Requiere una conexión MT5 ya inicializada. None si MT5 falló (el bloque debe repetirse);
+    # un DataFrame vacío si el servidor respondió sin velas en el rango.
+    rates = mt5.copy_rates_range(symbol, TIMEFRAME_MAP[tf_name], inicio, fin - timedelta(seconds=1))
+    if rates is None:
+        print(f"❌ {symbol} ({tf_name}) {inicio:%Y-%m-%d %H:%M}: {mt5.last_error()}")
+        return None
+    if len(rates) == 0:
+        return pd.DataFrame()
+    df = pd.DataFrame(rates)
+    df['time'] = pd.to_datetime(df['time'], unit='s')
+    return df
+
+
+def descargar_por_bloques(symbol, tf_name, desde, hasta):
+    # Descarga secuencial por bloques sobre la conexión actual
+    partes = [descargar_bloque(symbol, tf_name, inicio, fin) for inicio, fin in bloques(desde, hasta, tf_name)]
+    partes = [df for df in partes if df is not None and not df.empty]
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True).drop_duplicates(subset='time')
+
+# ===============================
+# Checkpoint
+# ===============================
+def cargar_checkpoint():
+    if os.path.exists(CHECKPOINT_FILE):
+        with open(CHECKPOINT_FILE, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def guardar_checkpoint(checkpoint):
+    # Escritura atómica para no dejar el archivo corrupto si se interrumpe
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(checkpoint, f, indent=1)
+    os.replace(tmp, CHECKPOINT_FILE)
+
+
+def clave_bloque(inicio, fin):
+    return f"{inicio:%Y-%m-%d %H:%M}|{fin:%Y-%m-%d %H:%M}"
+
+# ===============================
+# Huecos frente al calendario esperado
+# ===============================
+def huecos(tiempos, symbol, tf_name):
+    # Rangos [inicio, fin) de velas esperadas que faltan en la serie
+    if len(tiempos) == 0:
+        return []
+    paso = TIMEFRAME_SECONDS[tf_name]
+    t = np.sort(pd.to_datetime(tiempos).to_numpy(dtype="datetime64[s]").astype("int64"))
+    esperados = np.arange(t[0], t[-1], paso)
+    if symbol not in CALENDARIO_24X7:
+        dia_semana = (esperados // 86400 + 3) % 7  # 1970-01-01 fue jueves; lunes = 0
+        esperados = esperados[dia_semana < 5]
+    faltantes = np.setdiff1d(esperados, t, assume_unique=True)
+    if len(faltantes) == 0:
+        return []
+
+    # Agrupar faltantes en rangos, uniendo los cercanos hasta el tamaño de un bloque
+    maximo = paso * BARRAS_POR_BLOQUE
+    rangos = []
+    inicio = anterior = faltantes[0]
+    for ts in faltantes[1:]:
+        if ts - inicio >= maximo:
+            rangos.append((inicio, anterior + paso))
+            inicio = ts
+        anterior = ts
+    rangos.append((inicio, anterior + paso))
+    return [(pd.Timestamp(int(a), unit='s').to_pydatetime(), pd.Timestamp(int(b), unit='s').to_pydatetime()) for a, b in rangos]
+
+# ===============================
+# Trabajadores del pool
+# ===============================
+def inicializar_proceso():
+    # Un proceso sin conexión no debe recibir bloques: se aborta el pool
+    if not mt5.initialize():
+        raise RuntimeError(f"MT5 no conectado en el proceso {os.getpid()}: {mt5.last_error()}")
+
+
+def tarea_bloque(symbol, tf_name, inicio, fin):
+    df = descargar_bloque(symbol, tf_name, inicio, fin)
+    if df is None:
+        raise RuntimeError(f"{symbol} ({tf_name}) {clave_bloque(inicio, fin)}: error de MT5, se reintentará")
+    if not df.empty:
+        carpeta = f"{PARTES_FOLDER}/{symbol}_{tf_name}"
+        os.makedirs(carpeta, exist_ok=True)
+        df.to_csv(f"{carpeta}/{inicio:%Y%m%d%H%M}_{fin:%Y%m%d%H%M}.csv", index=False)
+    return symbol, tf_name, clave_bloque(inicio, fin), len(df)
+
+# ===============================
+# Unir partes al CSV principal
+# ===============================
+def unir_partes(symbol, tf_name):
+    file_path = ruta_datos(symbol, tf_name)
+    archivos = glob.glob(f"{PARTES_FOLDER}/{symbol}_{tf_name}/*.csv")
+    partes = [pd.read_csv(archivo) for archivo in archivos]
+    if os.path.exists(file_path):
+        partes.insert(0, pd.read_csv(file_path))
+    if not partes:
+        return pd.DataFrame()
+
+    df = pd.concat(partes, ignore_index=True)
+    df['time'] = pd.to_datetime(df['time'])
+    df = df.drop_duplicates(subset='time').sort_values('time').reset_index(drop=True)
+    df.to_csv(file_path, index=False)
+    for archivo in archivos:
+        os.remove(archivo)
+    return df
+
+# ===============================
+# Backfill
+# ===============================
+def ejecutar_tareas(tareas, checkpoint, procesos):
+    with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar_proceso) as pool:
+        futuros = [pool.submit(tarea_bloque, *tarea) for tarea in tareas]
+        for futuro in as_completed(futuros):
+            try:
+                symbol, tf_name, clave, n = futuro.result()
+            except BrokenProcessPool:
+                # Un trabajador no pudo conectarse a MT5: no tiene sentido seguir
+                raise
+            except Exception as e:
+                # El bloque no se anota en el checkpoint y se vuelve a pedir en la próxima ejecución
+                print(f"❌ Error descargando bloque: {e}")
+                continue
+            checkpoint.setdefault(f"{symbol}_{tf_name}", {})[clave] = n
+            guardar_checkpoint(checkpoint)
+            print(f"📥 {symbol} ({tf_name}) {clave}: {n} velas")
+
+
+def backfill(config=BACKFILL_CONFIG, hasta=None, procesos=MAX_PROCESOS):
+    hasta = hasta or datetime.now()
+    os.makedirs(DATA_FOLDER, exist_ok=True)
+    checkpoint = cargar_checkpoint()
+
+    # 1) Rango completo por bloques, saltando los ya descargados
+    tareas = []
+    for symbol, timeframes in config.items():
+        for tf_name in timeframes:
+            hechos = checkpoint.get(f"{symbol}_{tf_name}", {})
+            for inicio, fin in bloques(INICIO_HISTORIAL, hasta, tf_name):
+                if clave_bloque(inicio, fin) not in hechos:
+                    tareas.append((symbol, tf_name, inicio, fin))
+    print(f"📅 {len(tareas)} bloques pendientes")
+    ejecutar_tareas(tareas, checkpoint, procesos)
+
+    # 2) Unir y rellenar huecos (cada hueco se intenta una sola vez)
+    series = {(symbol, tf_name): unir_partes(symbol, tf_name) for symbol, tfs in config.items() for tf_name in tfs}
+    tareas = []
+    for (symbol, tf_name), df in series.items():
+        if df.empty:
+            continue
+        hechos = checkpoint.get(f"{symbol}_{tf_name}", {})
+        for inicio, fin in huecos(df['time'], symbol, tf_name):
+            if clave_bloque(inicio, fin) not in hechos:
+                tareas.append((symbol, tf_name, inicio, fin))
+    if tareas:
+        print(f"🕳️ {len(tareas)} huecos por rellenar")
+        ejecutar_tareas(tareas, checkpoint, procesos)
+        for symbol, tf_name in {(symbol, tf_name) for symbol, tf_name, _, _ in tareas}:
+            series[(symbol, tf_name)] = unir_partes(symbol, tf_name)
+
+    for (symbol, tf_name), df in series.items():
+        print(f"✅ {symbol} ({tf_name}): {len(df)} velas en {ruta_datos(symbol, tf_name)}")
+
+
+if __name__ == "__main__":
+    backfill()
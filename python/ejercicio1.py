@@ -1,18 +1,34 @@
 #pip install nltk
 #Este ejercicio busca realizar un análisis básico de texto utilizando herramientas de procesamiento
 # de lenguaje natural (NLP) proporcionadas por la biblioteca NLTK (Natural Language Toolkit) en Python
+#
+# El análisis se hace en streaming: los documentos (archivos o directorios) se leen por
+# fragmentos, cada fragmento se tokeniza y se deriva en un pool de procesos, y los contadores
+# parciales se combinan al final. La memoria se mantiene acotada sin importar el tamaño del corpus.
+#
+# Uso: python ejercicio1.py [archivo_o_directorio ...]   (sin argumentos analiza el texto de muestra)
+
+import os
+import sys
+from collections import Counter, deque
+from functools import lru_cache
+from multiprocessing import Pool, cpu_count
 
 import nltk
 from nltk.corpus import stopwords
 from nltk.tokenize import word_tokenize
-from nltk.stem import PorterStemmer
+from nltk.stem import SnowballStemmer
 from nltk.probability import FreqDist
 
-# Descargar los recursos de NLTK (solo necesario una vez)
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('gutenberg')
-nltk.download('genesis')
+RECURSOS = {
+    'punkt': 'tokenizers/punkt',
+    'punkt_tab': 'tokenizers/punkt_tab',
+    'stopwords': 'corpora/stopwords',
+}
+TAMANO_FRAGMENTO = 4 * 1024 * 1024  # caracteres por fragmento
+SEPARADORES = ' \n\t\r\f\v'  # espacios donde se puede cortar un fragmento sin partir palabras
+FRAGMENTOS_EN_VUELO = 2  # fragmentos pendientes por proceso (acota la memoria)
+TAMANO_CACHE_RAICES = 200_000
 
 # Texto de muestra para el análisis
 texto_ejemplo = """El deporte es una parte integral de la sociedad humana, con una rica historia que se remonta a miles de años. Desde los Juegos Olímpicos de la antigua Grecia hasta los eventos deportivos contemporáneos que atraen a millones de espectadores de todo el mundo, el deporte ha desempeñado un papel fundamental en la cultura, la identidad nacional y la cohesión social.
@@ -25,18 +41,88 @@ En el ámbito de la tecnología y la innovación, el deporte también está expe
 
 En resumen, el mundo del deporte es un campo dinámico y en constante evolución que abarca una amplia gama de actividades, industrias y tecnologías. Desde el entretenimiento y la competencia hasta la innovación y el impacto social, el deporte sigue desempeñando un papel crucial en la vida de las personas en todo el mundo."""
 
-# Tokenizar el texto en palabras
-tokens = word_tokenize(texto_ejemplo)
 
-# Eliminar las palabras de parada
-stop_words = set(stopwords.words('spanish'))
-tokens_filtrados = [word for word in tokens if word.lower() not in stop_words]
+# Descargar los recursos de NLTK solo si no están ya en la caché local
+def asegurar_recursos():
+    for nombre, ruta in RECURSOS.items():
+        try:
+            nltk.data.find(ruta)
+        except LookupError:
+            nltk.download(nombre, quiet=True)
+
+
+# Recorrer archivos y directorios de entrada
+def listar_archivos(rutas):
+    for ruta in rutas:
+        if os.path.isdir(ruta):
+            for raiz, _, archivos in os.walk(ruta):
+                for archivo in sorted(archivos):
+                    yield os.path.join(raiz, archivo)
+        else:
+            yield ruta
+
+
+# Leer un archivo por fragmentos sin partir palabras entre fragmentos
+def leer_fragmentos(ruta, tamano=TAMANO_FRAGMENTO):
+    resto = ''
+    with open(ruta, encoding='utf-8', errors='ignore') as f:
+        while True:
+            bloque = f.read(tamano)
+            if not bloque:
+                break
+            bloque = resto + bloque
+            corte = max(bloque.rfind(separador) for separador in SEPARADORES)
+            if corte <= 0:
+                # Sin espacios en todo el bloque: se corta en seco para que la memoria siga acotada
+                corte = len(bloque)
+            resto = bloque[corte:]
+            yield bloque[:corte]
+    if resto.strip():
+        yield resto
+
+
+# Estado de cada proceso: palabras de parada y derivador con caché de raíces
+_stop_words = None
+_derivar = None
+
+
+def inicializar_proceso():
+    global _stop_words, _derivar
+    _stop_words = set(stopwords.words('spanish'))
+    # Derivador para español (PorterStemmer solo sirve para inglés)
+    _derivar = lru_cache(maxsize=TAMANO_CACHE_RAICES)(SnowballStemmer('spanish').stem)
+
+
+def procesar_fragmento(texto):
+    # Tokenizar, eliminar palabras de parada y derivar raíces de un fragmento
+    tokens = word_tokenize(texto, language='spanish')
+    return Counter(_derivar(palabra) for palabra in tokens if palabra.lower() not in _stop_words)
+
+
+def analizar(fragmentos, procesos=None):
+    # Repartir los fragmentos entre procesos con un número acotado de tareas pendientes
+    procesos = procesos or cpu_count()
+    total = Counter()
+    pendientes = deque()
+    with Pool(procesos, initializer=inicializar_proceso) as pool:
+        for fragmento in fragmentos:
+            pendientes.append(pool.apply_async(procesar_fragmento, (fragmento,)))
+            if len(pendientes) >= procesos * FRAGMENTOS_EN_VUELO:
+                total.update(pendientes.popleft().get())
+        while pendientes:
+            total.update(pendientes.popleft().get())
+    return FreqDist(total)
+
+
+if __name__ == '__main__':
+    asegurar_recursos()
 
-# Realizar la derivación de raíces
-porter = PorterStemmer()
-tokens_derivados = [porter.stem(word) for word in tokens_filtrados]
+    if len(sys.argv) > 1:
+        fragmentos = (fragmento for ruta in listar_archivos(sys.argv[1:]) for fragmento in leer_fragmentos(ruta))
+    else:
+        fragmentos = [texto_ejemplo]
 
-# Calcular la distribución de frecuencia de las palabras
-dist_freq = FreqDist(tokens_derivados)
-print("Distribución de frecuencia:")
-print(dist_freq.most_common())
+    # Calcular la distribución de frecuencia de las palabras
+    dist_freq = analizar(fragmentos)
+    print("Distribución de frecuencia:")
+    print(dist_freq.most_common())
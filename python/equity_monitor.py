@@ -0,0 +1,149 @@
+import MetaTrader5 as mt5
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = 1.0  # seconds
+STATE_FILE = "equity_state.json"
+
+
+class EquityMonitor:
+    """Samples account equity on a background thread and trips a circuit breaker.
+
+    Running peak (high-water mark) and drawdown are updated in O(1) per sample
+    and persisted after every sample, so they survive restarts. Order paths only
+    read `trading_allowed`, a plain attribute written by the monitor thread.
+
+    The breaker trips when equity falls `max_drawdown` (fraction) below the peak
+    or below `min_equity_ratio` of the initial balance; a limit left as None is
+    not enforced. Once tripped it stays tripped, across restarts, until reset().
+    """
+
+    def __init__(self, state_file=STATE_FILE, interval=SAMPLE_INTERVAL, max_drawdown=None,
+                 min_equity_ratio=None, initial_balance=None):
+        self.state_file = state_file
+        self.interval = interval
+        self.max_drawdown = max_drawdown
+        self.min_equity_ratio = min_equity_ratio
+        self.state = {
+            "initial_balance": initial_balance,
+            "peak_equity": None,
+            "equity": None,
+            "balance": None,
+            "drawdown": 0.0,
+            "max_drawdown": 0.0,
+            "tripped": False,
+            "reason": "",
+            "updated_at": None,
+        }
+        self._load()
+        self.trading_allowed = not self.state["tripped"]
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Read-only accessors for order paths ---
+
+    @property
+    def balance(self):
+        return self.state["balance"]
+
+    @property
+    def initial_balance(self):
+        return self.state["initial_balance"]
+
+    @property
+    def reason(self):
+        return self.state["reason"]
+
+    # --- Persistence ---
+
+    def _load(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            logger.exception(f"Could not read {self.state_file}; starting with a fresh state")
+            return
+        initial = self.state["initial_balance"]
+        self.state.update(saved)
+        if self.state["initial_balance"] is None:
+            self.state["initial_balance"] = initial
+
+    def _save(self):
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.state_file)
+
+    # --- Sampling ---
+
+    def update(self, equity, balance):
+        """Fold one equity sample into the running statistics."""
+        state = self.state
+        if state["initial_balance"] is None:
+            state["initial_balance"] = balance
+        if state["peak_equity"] is None or equity > state["peak_equity"]:
+            state["peak_equity"] = equity
+        state["equity"] = equity
+        state["balance"] = balance
+        state["drawdown"] = 1 - equity / state["peak_equity"] if state["peak_equity"] > 0 else 0.0
+        state["max_drawdown"] = max(state["max_drawdown"], state["drawdown"])
+        state["updated_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        if not state["tripped"]:
+            if self.max_drawdown is not None and state["drawdown"] >= self.max_drawdown:
+                self._trip(f"drawdown {state['drawdown']:.2%} from peak {state['peak_equity']:.2f}")
+            elif self.min_equity_ratio is not None and equity < state["initial_balance"] * self.min_equity_ratio:
+                self._trip(f"equity {equity:.2f} below {self.min_equity_ratio:.0%} of initial balance {state['initial_balance']:.2f}")
+
+    def _trip(self, reason):
+        self.state["tripped"] = True
+        self.state["reason"] = reason
+        self.trading_allowed = False
+        logger.error(f"Circuit breaker tripped: {reason}. No new trades will be opened.")
+
+    def reset(self):
+        """Re-enable trading and restart the high-water mark from current equity."""
+        self.state["tripped"] = False
+        self.state["reason"] = ""
+        self.state["peak_equity"] = self.state["equity"]
+        self.state["drawdown"] = 0.0
+        self.trading_allowed = True
+        self._save()
+
+    def sample(self):
+        account_info = mt5.account_info()
+        if account_info is None:
+            logger.warning(f"Equity sample skipped: {mt5.last_error()}")
+            return False
+        self.update(account_info.equity, account_info.balance)
+        self._save()
+        return True
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception:
+                logger.exception("Equity sample failed")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Take a first sample synchronously, then keep sampling in the background."""
+        self.sample()
+        self._thread = threading.Thread(target=self.run, name="equity-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
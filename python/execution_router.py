@@ -0,0 +1,142 @@
+# Router de ejecución: replica cada señal en varias cuentas/terminales MT5 en paralelo.
+#
+# Cada cuenta se define en ACCOUNTS_FILE (no se versiona porque contiene credenciales):
+# [
+#   {"name": "cuenta1", "path": "C:/MT5_1/terminal64.exe", "login": 123, "password": "...",
+#    "server": "Exness-MT5Trial", "default_lot": 0.05, "max_open_positions": 4},
+#   ...
+# ]
+# La librería MetaTrader5 solo maneja un terminal por proceso, así que cada cuenta
+# tiene su propio proceso que mantiene la conexión abierta entre señales.
+#
+# MetaTrader5 y mt5_bridge se importan solo dentro de los procesos trabajadores: el proceso
+# del webhook no los necesita y arranca sin cargarlos.
+import json
+import os
+import threading
+import time
+import multiprocessing as mp
+from queue import Empty
+
+ACCOUNTS_FILE = "accounts.json"
+RESPONSE_TIMEOUT = 30  # segundos
+
+# ----------------------------
+# Cargar las cuentas configuradas
+# ----------------------------
+def cargar_cuentas(path=ACCOUNTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+# ----------------------------
+# Conectar un proceso a su terminal
+# ----------------------------
+def conectar_terminal(cuenta):
+    import MetaTrader5 as mt5
+    kwargs = {key: cuenta[key] for key in ("login", "password", "server") if key in cuenta}
+    if "path" in cuenta:
+        return mt5.initialize(cuenta["path"], **kwargs)
+    return mt5.initialize(**kwargs)
+
+# ----------------------------
+# Proceso trabajador: una conexión persistente por terminal
+# ----------------------------
+def worker_cuenta(cuenta, solicitudes, respuestas):
+    import MetaTrader5 as mt5
+    import mt5_bridge
+    import execution_stats
+
+    nombre = cuenta["name"]
+    lot = cuenta.get("default_lot", mt5_bridge.default_lot)
+    max_positions = cuenta.get("max_open_positions", mt5_bridge.max_open_positions)
+    estado_equity = f"equity_state_{nombre}.json"
+    # Estadísticas de ejecución propias de la cuenta: desviación y modos de llenado no se mezclan
+    execution_stats.use_log(f"logs/executions_{nombre}.csv")
+    conectado = conectar_terminal(cuenta)
+    if conectado:
+        mt5_bridge.iniciar_monitor(estado_equity)
+    else:
+        print(f"❌ [{nombre}] Error inicializando MT5: {mt5.last_error()}")
+
+    while True:
+        tarea = solicitudes.get()
+        if tarea is None:
+            break
+        id_tarea, args = tarea
+
+        if not conectado:
+            conectado = conectar_terminal(cuenta)
+            if conectado:
+                mt5_bridge.iniciar_monitor(estado_equity)
+        if not conectado:
+            respuestas.put((id_tarea, nombre, [f"❌ [{nombre}] Error inicializando MT5: {mt5.last_error()}"], 0.0))
+            continue
+
+        inicio = time.perf_counter()
+        try:
+            resultado = mt5_bridge.ejecutar_senal(*args, lot=lot, max_positions=max_positions)
+        except Exception as e:
+            resultado = [f"❌ [{nombre}] Error al ejecutar la señal: {e}"]
+        respuestas.put((id_tarea, nombre, resultado, time.perf_counter() - inicio))
+
+    mt5_bridge.detener_monitor()
+    mt5.shutdown()
+
+# ----------------------------
+# Router: reparte cada señal a todas las cuentas y agrega los resultados
+# ----------------------------
+class ExecutionRouter:
+    def __init__(self, cuentas):
+        self.cuentas = cuentas
+        self.respuestas = mp.Queue()
+        self.colas = {}
+        self.procesos = []
+        self.lock = threading.Lock()
+        self.siguiente_id = 0
+
+    def iniciar(self):
+        for cuenta in self.cuentas:
+            cola = mp.Queue()
+            proceso = mp.Process(target=worker_cuenta, args=(cuenta, cola, self.respuestas),
+                                 name=f"mt5-{cuenta['name']}", daemon=True)
+            proceso.start()
+            self.colas[cuenta["name"]] = cola
+            self.procesos.append(proceso)
+        print(f"🔀 Router iniciado con {len(self.procesos)} cuentas.")
+
+    def detener(self):
+        for cola in self.colas.values():
+            cola.put(None)
+        for proceso in self.procesos:
+            proceso.join(timeout=5)
+
+    def enviar(self, signal, entry, sl, tp, tf=None, symbol=None):
+        """Envía la señal a todas las cuentas a la vez y espera a la más lenta."""
+        with self.lock:
+            self.siguiente_id += 1
+            id_tarea = self.siguiente_id
+            args = (signal, entry, sl, tp, tf, symbol)
+            for cola in self.colas.values():
+                cola.put((id_tarea, args))
+
+            resultados = {}
+            limite = time.monotonic() + RESPONSE_TIMEOUT
+            while len(resultados) < len(self.colas):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    id_resp, nombre, resultado, duracion = self.respuestas.get(timeout=restante)
+                except Empty:
+                    break
+                if id_resp != id_tarea:
+                    continue  # respuesta tardía de una señal anterior
+                print(f"⏱️ [{nombre}] {duracion * 1000:.0f} ms")
+                resultados[nombre] = resultado
+
+            for nombre in self.colas:
+                if nombre not in resultados:
+                    resultados[nombre] = [f"❌ [{nombre}] Sin respuesta en {RESPONSE_TIMEOUT} s."]
+            return resultados
@@ -0,0 +1,233 @@
+import MetaTrader5 as mt5
+import csv
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from symbol_constraints import get_constraints
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_LOG = "logs/executions.csv"
+WINDOW = 200  # last orders per symbol kept in the rolling distributions
+MIN_SAMPLES = 20  # fills needed before the deviation follows the slippage distribution
+
+DEFAULT_DEVIATION = 20  # points; the fixed value every order path used before
+MIN_DEVIATION = 10
+MAX_DEVIATION = 200
+DEVIATION_MARGIN = 1.5  # deviation = margin x p95 adverse slippage
+REQUOTE_RATE_LIMIT = 0.05  # above this requote rate the deviation is widened
+REQUOTE_STEP = 10  # points added while the requote rate is above the limit
+
+FIELDS = ["datetime", "symbol", "type", "volume", "requested_price", "fill_price", "slippage_points",
+          "latency_ms", "retcode", "comment", "deviation", "filling"]
+
+
+REQUOTE_RETCODES = {mt5.TRADE_RETCODE_REQUOTE, mt5.TRADE_RETCODE_PRICE_CHANGED, mt5.TRADE_RETCODE_PRICE_OFF}
+FILLED_RETCODES = {mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL}
+
+
+class SymbolExecutions:
+    """Rolling window of the last orders sent for one symbol."""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.latency_ms = np.zeros(window)
+        self.slippage = np.full(window, np.nan)  # adverse slippage in points, NaN when not filled
+        self.filled = np.zeros(window, dtype=bool)
+        self.requoted = np.zeros(window, dtype=bool)
+        self.head = 0
+        self.count = 0
+        self.deviation = DEFAULT_DEVIATION
+        self.bad_fillings = set()  # filling modes the server rejected for this symbol
+
+    def add(self, latency_ms, slippage, filled, requoted):
+        i = self.head
+        self.latency_ms[i] = latency_ms
+        self.slippage[i] = slippage if filled else np.nan
+        self.filled[i] = filled
+        self.requoted[i] = requoted
+        self.head = (i + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+    def summary(self):
+        n = self.count
+        if n == 0:
+            return {"orders": 0}
+        latency = self.latency_ms[:n]
+        slippage = self.slippage[:n][self.filled[:n]]
+        return {
+            "orders": n,
+            "fill_rate": float(self.filled[:n].mean()),
+            "requote_rate": float(self.requoted[:n].mean()),
+            "latency_p50_ms": float(np.percentile(latency, 50)),
+            "latency_p95_ms": float(np.percentile(latency, 95)),
+            "slippage_mean": float(slippage.mean()) if len(slippage) else 0.0,
+            "slippage_p95": float(np.percentile(slippage, 95)) if len(slippage) else 0.0,
+            "deviation": self.deviation,
+        }
+
+    def adapt_deviation(self):
+        """Cover the p95 adverse slippage, widening further while requotes are frequent.
+
+        The slippage term needs MIN_SAMPLES fills; the requote step applies on any number of
+        orders, since heavy requoting is precisely what leaves few fills to measure.
+        """
+        n = self.count
+        slippage = self.slippage[:n][self.filled[:n]]
+        if len(slippage) >= MIN_SAMPLES:
+            target = math.ceil(max(np.percentile(slippage, 95), 0) * DEVIATION_MARGIN)
+        else:
+            target = DEFAULT_DEVIATION
+        if n and self.requoted[:n].mean() > REQUOTE_RATE_LIMIT:
+            target += REQUOTE_STEP
+        self.deviation = int(min(max(target, MIN_DEVIATION), MAX_DEVIATION))
+        return self.deviation
+
+
+class ExecutionStats:
+    """Times every order_send and keeps per-symbol latency, slippage and rejection statistics.
+
+    Each order is appended to log_file. On startup the tail of the log refills the rolling
+    windows, so the adapted deviation and filling mode survive restarts.
+    """
+
+    def __init__(self, log_file=EXECUTION_LOG, window=WINDOW):
+        self.log_file = log_file
+        self.window = window
+        self.symbols = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def _symbol(self, symbol):
+        stats = self.symbols.get(symbol)
+        if stats is None:
+            stats = self.symbols[symbol] = SymbolExecutions(self.window)
+        return stats
+
+    # --- Order path ---
+
+    def send(self, request):
+        """mt5.order_send with timing and recording. Returns the result (None if MT5 did not answer)."""
+        start = time.perf_counter()
+        result = mt5.order_send(request)
+        latency_ms = (time.perf_counter() - start) * 1000
+        try:
+            self.record(request, result, latency_ms)
+        except Exception:
+            logger.exception("Failed to record execution")
+        return result
+
+    def deviation(self, symbol):
+        stats = self.symbols.get(symbol)
+        return stats.deviation if stats is not None else DEFAULT_DEVIATION
+
+    def filling_mode(self, symbol, constraints):
+        """Preferred filling mode of the symbol, skipping modes the server has rejected."""
+        stats = self.symbols.get(symbol)
+        modes = constraints.get("filling_modes", [constraints["filling_mode"]])
+        if stats is not None:
+            for mode in modes:
+                if mode not in stats.bad_fillings:
+                    return mode
+        return modes[0]
+
+    # --- Recording ---
+
+    def record(self, request, result, latency_ms, log=True):
+        symbol = request["symbol"]
+        requested = request.get("price", 0.0)
+        retcode = result.retcode if result is not None else None
+        fill_price = result.price if result is not None and result.price else None
+        slippage = None
+        if fill_price is not None and requested:
+            constraints = get_constraints(symbol)
+            point = constraints["point"] if constraints else 1.0
+            sign = 1 if request["type"] == mt5.ORDER_TYPE_BUY else -1
+            slippage = sign * (fill_price - requested) / point
+        comment = result.comment if result is not None else str(mt5.last_error())
+        row = [datetime.now().strftime("%Y-%m-%d %H:%M:%S"), symbol, request["type"], request.get("volume"),
+               requested, fill_price, None if slippage is None else round(slippage, 1), round(latency_ms, 2),
+               retcode, comment, request.get("deviation"), request.get("type_filling")]
+        with self.lock:
+            self._add(row)
+        if log:
+            self._append(row)
+        if retcode not in FILLED_RETCODES:
+            logger.warning(f"{symbol}: order not filled (retcode {retcode}, {comment}) after {latency_ms:.0f} ms")
+
+    def _add(self, row):
+        symbol, retcode, filling = row[1], row[8], row[11]
+        stats = self._symbol(symbol)
+        filled = retcode in FILLED_RETCODES
+        slippage = row[6] if row[6] is not None else 0.0
+        stats.add(row[7], slippage, filled, retcode in REQUOTE_RETCODES)
+        if retcode == mt5.TRADE_RETCODE_INVALID_FILL and filling is not None:
+            stats.bad_fillings.add(filling)
+        stats.adapt_deviation()
+
+    def _append(self, row):
+        os.makedirs(os.path.dirname(self.log_file) or ".", exist_ok=True)
+        new_file = not os.path.exists(self.log_file)
+        with self.lock:
+            with open(self.log_file, "a", newline="") as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(FIELDS)
+                writer.writerow(row)
+
+    def load(self):
+        if not os.path.exists(self.log_file):
+            return
+        with open(self.log_file, newline="") as f:
+            rows = deque(csv.DictReader(f), maxlen=self.window * 20)
+
+        def number(value, cast=float):
+            return cast(value) if value not in (None, "") else None
+
+        for r in rows:
+            self._add([r["datetime"], r["symbol"], number(r["type"], int), number(r["volume"]),
+                       number(r["requested_price"]), number(r["fill_price"]), number(r["slippage_points"]),
+                       number(r["latency_ms"]), number(r["retcode"], int), r["comment"],
+                       number(r["deviation"], int), number(r["filling"], int)])
+
+    def summary(self):
+        return {symbol: stats.summary() for symbol, stats in self.symbols.items()}
+
+
+STATS = ExecutionStats()
+
+
+def use_log(log_file):
+    """Switch this process to its own log, e.g. one per account in the execution router."""
+    global STATS
+    STATS = ExecutionStats(log_file)
+    return STATS
+
+
+def send_order(request):
+    return STATS.send(request)
+
+
+def get_deviation(symbol):
+    return STATS.deviation(symbol)
+
+
+def get_filling_mode(symbol, constraints):
+    return STATS.filling_mode(symbol, constraints)
+
+
+if __name__ == "__main__":
+    # Usage: python execution_stats.py [executions.csv]
+    stats = ExecutionStats(sys.argv[1]) if len(sys.argv) > 1 else STATS
+    for symbol, s in stats.summary().items():
+        print(f"{symbol}: {s['orders']} orders | fill {s['fill_rate']:.1%} | requotes {s['requote_rate']:.1%} | "
+              f"latency p50 {s['latency_p50_ms']:.0f} ms, p95 {s['latency_p95_ms']:.0f} ms | "
+              f"slippage mean {s['slippage_mean']:.1f}, p95 {s['slippage_p95']:.1f} pts | deviation {s['deviation']}")
@@ -0,0 +1,242 @@
+# Capa de aceleración de consultas para mejorRuta.Grafo.
+#
+# - Caché LRU de árboles de caminos mínimos por origen: una consulta repetida desde
+#   el mismo origen solo recorre los predecesores (microsegundos).
+# - Búsqueda bidireccional cuando no hay índice.
+# - Índice ALT (A* con landmarks y desigualdad triangular), persistible en disco e
+#   invalidado automáticamente cuando cambian los vértices o las aristas del grafo.
+import hashlib
+import heapq
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+INF = float('inf')
+CAPACIDAD_CACHE = 256  # Árboles de caminos mínimos en memoria
+CONSULTAS_PARA_ARBOL = 2  # Consultas desde un mismo origen antes de cachear su árbol
+NUMERO_DE_LANDMARKS = 8
+
+
+def dijkstra_completo(csr, n, origen):
+    # Distancias y predecesores desde origen hacia todos los vértices
+    inicio_filas, destinos, pesos = csr
+    distancia = [INF] * n
+    predecesor = [-1] * n
+    distancia[origen] = 0
+    cola = [(0, origen)]
+    while cola:
+        distancia_actual, u = heapq.heappop(cola)
+        if distancia_actual > distancia[u]:
+            continue
+        for i in range(inicio_filas[u], inicio_filas[u + 1]):
+            v = destinos[i]
+            distancia_total = distancia_actual + pesos[i]
+            if distancia_total < distancia[v]:
+                distancia[v] = distancia_total
+                predecesor[v] = u
+                heapq.heappush(cola, (distancia_total, v))
+    return distancia, predecesor
+
+
+class IndiceRutas:
+    def __init__(self, grafo, capacidad_cache=CAPACIDAD_CACHE, archivo=None):
+        self.grafo = grafo
+        self.capacidad_cache = capacidad_cache
+        self.archivo = archivo
+        self.version = None
+        self.reiniciar()
+        if archivo and os.path.exists(archivo):
+            self.cargar(archivo)
+
+    def reiniciar(self):
+        self.arboles = OrderedDict()  # origen -> (distancia, predecesor)
+        self.consultas_por_origen = {}
+        self.landmarks = None  # Índices de los landmarks
+        self.distancias_landmarks = None  # Matriz landmarks x vértices
+        self.version = self.grafo.version
+
+    def csr(self):
+        # Invalidar todo lo derivado si el grafo cambió desde la última consulta
+        if self.grafo.version != self.version:
+            self.reiniciar()
+        return self.grafo.csr or self.grafo.construir_csr()
+
+    def firma(self):
+        # Huella del grafo para validar un índice guardado en disco
+        inicio_filas, destinos, pesos = self.csr()
+        h = hashlib.sha1()
+        h.update("\0".join(self.grafo.nombres).encode("utf-8"))
+        h.update(np.asarray(inicio_filas, dtype=np.int64).tobytes())
+        h.update(np.asarray(destinos, dtype=np.int64).tobytes())
+        h.update(np.asarray(pesos, dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    # ----------------------------
+    # Consultas
+    # ----------------------------
+    def ruta(self, inicio, fin):
+        # Devuelve (camino, tiempo total); ([], inf) si no hay ruta
+        indice = self.grafo.indice
+        if inicio not in indice or fin not in indice:
+            return [], INF
+        csr = self.csr()
+        s, t = indice[inicio], indice[fin]
+
+        if s in self.arboles:
+            self.arboles.move_to_end(s)
+            return self.camino_desde_arbol(self.arboles[s], s, t)
+        if t in self.arboles:
+            # Grafo no dirigido: el camino de t a s invertido también es mínimo
+            self.arboles.move_to_end(t)
+            camino, tiempo = self.camino_desde_arbol(self.arboles[t], t, s)
+            return camino[::-1], tiempo
+
+        self.consultas_por_origen[s] = self.consultas_por_origen.get(s, 0) + 1
+        if self.consultas_por_origen[s] >= CONSULTAS_PARA_ARBOL:
+            return self.camino_desde_arbol(self.arbol(s), s, t)
+        if self.landmarks is not None:
+            return self.alt(s, t)
+        return self.bidireccional(s, t)
+
+    def arbol(self, origen):
+        # Árbol de caminos mínimos desde origen, con caché LRU
+        csr = self.csr()
+        if origen in self.arboles:
+            self.arboles.move_to_end(origen)
+            return self.arboles[origen]
+        arbol = dijkstra_completo(csr, len(self.grafo.nombres), origen)
+        self.arboles[origen] = arbol
+        if len(self.arboles) > self.capacidad_cache:
+            self.arboles.popitem(last=False)
+        return arbol
+
+    def camino_desde_arbol(self, arbol, s, t):
+        distancia, predecesor = arbol
+        if distancia[t] == INF:
+            return [], INF
+        nombres = self.grafo.nombres
+        camino = []
+        u = t
+        while u != s:
+            camino.append(nombres[u])
+            u = predecesor[u]
+        camino.append(nombres[s])
+        camino.reverse()
+        return camino, distancia[t]
+
+    def bidireccional(self, s, t):
+        # Dijkstra simultáneo desde el origen y desde el destino
+        inicio_filas, destinos, pesos = self.csr()
+        distancias = ({s: 0}, {t: 0})
+        predecesores = ({s: -1}, {t: -1})
+        cerrados = (set(), set())
+        colas = ([(0, s)], [(0, t)])
+        mejor, encuentro = (0, s) if s == t else (INF, -1)
+
+        while colas[0] and colas[1] and colas[0][0][0] + colas[1][0][0] < mejor:
+            lado = 0 if colas[0][0][0] <= colas[1][0][0] else 1
+            distancia, predecesor, cerrado = distancias[lado], predecesores[lado], cerrados[lado]
+            distancia_otro = distancias[1 - lado]
+            distancia_actual, u = heapq.heappop(colas[lado])
+            if u in cerrado:
+                continue
+            cerrado.add(u)
+            for i in range(inicio_filas[u], inicio_filas[u + 1]):
+                v = destinos[i]
+                distancia_total = distancia_actual + pesos[i]
+                if distancia_total < distancia.get(v, INF):
+                    distancia[v] = distancia_total
+                    predecesor[v] = u
+                    heapq.heappush(colas[lado], (distancia_total, v))
+                if v in distancia_otro and distancia[v] + distancia_otro[v] < mejor:
+                    mejor = distancia[v] + distancia_otro[v]
+                    encuentro = v
+
+        if encuentro == -1:
+            return [], INF
+        nombres = self.grafo.nombres
+        ida = []
+        u = encuentro
+        while u != -1:
+            ida.append(nombres[u])
+            u = predecesores[0][u]
+        ida.reverse()
+        u = predecesores[1][encuentro]
+        while u != -1:
+            ida.append(nombres[u])
+            u = predecesores[1][u]
+        return ida, mejor
+
+    def alt(self, s, t):
+        # A* con cota inferior por desigualdad triangular respecto a los landmarks
+        inicio_filas, destinos, pesos = self.csr()
+        d = self.distancias_landmarks
+        hacia_t = d[:, t][:, None]
+        validos = np.isfinite(d) & np.isfinite(hacia_t)
+        cota = np.where(validos, np.abs(hacia_t - np.where(validos, d, 0)), 0).max(axis=0).tolist()
+
+        distancia = {s: 0}
+        predecesor = {s: -1}
+        cola = [(cota[s], s)]
+        while cola:
+            _, u = heapq.heappop(cola)
+            if u == t:
+                break
+            distancia_actual = distancia[u]
+            for i in range(inicio_filas[u], inicio_filas[u + 1]):
+                v = destinos[i]
+                distancia_total = distancia_actual + pesos[i]
+                if distancia_total < distancia.get(v, INF):
+                    distancia[v] = distancia_total
+                    predecesor[v] = u
+                    heapq.heappush(cola, (distancia_total + cota[v], v))
+
+        if t not in distancia:
+            return [], INF
+        nombres = self.grafo.nombres
+        camino = []
+        u = t
+        while u != -1:
+            camino.append(nombres[u])
+            u = predecesor[u]
+        camino.reverse()
+        return camino, distancia[t]
+
+    # ----------------------------
+    # Preprocesamiento y persistencia
+    # ----------------------------
+    def preprocesar(self, numero_de_landmarks=NUMERO_DE_LANDMARKS):
+        # Elegir landmarks por el vértice más lejano y guardar sus distancias a todos los vértices
+        csr = self.csr()
+        n = len(self.grafo.nombres)
+        landmarks = []
+        filas = []
+        mas_cercano = np.full(n, INF)
+        siguiente = 0
+        for _ in range(min(numero_de_landmarks, n)):
+            distancia, _ = dijkstra_completo(csr, n, siguiente)
+            landmarks.append(siguiente)
+            fila = np.array(distancia)
+            filas.append(fila)
+            mas_cercano = np.minimum(mas_cercano, np.where(np.isfinite(fila), fila, 0))
+            siguiente = int(np.argmax(mas_cercano))
+        self.landmarks = np.array(landmarks, dtype=np.int64)
+        self.distancias_landmarks = np.vstack(filas)
+        if self.archivo:
+            self.guardar(self.archivo)
+
+    def guardar(self, archivo):
+        # A través del archivo abierto, para que np.savez no añada ".npz" a un nombre sin extensión
+        with open(archivo, "wb") as f:
+            np.savez(f, firma=self.firma(), landmarks=self.landmarks,
+                     distancias_landmarks=self.distancias_landmarks)
+
+    def cargar(self, archivo):
+        # Cargar el índice solo si corresponde al grafo actual
+        with np.load(archivo) as datos:
+            if str(datos["firma"]) != self.firma():
+                return False
+            self.landmarks = datos["landmarks"]
+            self.distancias_landmarks = datos["distancias_landmarks"]
+        return True
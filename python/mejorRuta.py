@@ -1,37 +1,103 @@
 import heapq  # Importar heapq para utilizar colas de prioridad
+import numpy as np  # Importar numpy para construir la representación CSR
 import networkx as nx  # Importar networkx para crear y manipular grafos
 import matplotlib.pyplot as plt  # Importar matplotlib para visualizar grafos
 
 class Grafo:
     def __init__(self):
         self.vertices = {}  # Inicializar un diccionario para almacenar los vértices y sus adyacencias
+        self.indice = {}  # Nombre de estación -> índice entero
+        self.nombres = []  # Índice entero -> nombre de estación
+        self.csr = None  # Representación CSR (se construye bajo demanda)
+        self.version = 0  # Se incrementa con cada cambio para invalidar índices derivados
 
     def agregar_vertice(self, vertice):
         if vertice not in self.vertices:
             self.vertices[vertice] = {}  # Agregar un nuevo vértice al grafo si no existe
+            self.indice[vertice] = len(self.nombres)
+            self.nombres.append(vertice)
+            self.csr = None
+            self.version += 1
 
     def agregar_arista(self, origen, destino, peso):
         if origen in self.vertices and destino in self.vertices:
             self.vertices[origen][destino] = peso  # Agregar una arista bidireccional entre origen y destino con un peso dado
             self.vertices[destino][origen] = peso
+            self.csr = None
+            self.version += 1
+
+    def construir_csr(self):
+        # Compactar las adyacencias en tres arreglos: inicio de fila, destinos y pesos
+        n = len(self.nombres)
+        grados = np.fromiter((len(self.vertices[v]) for v in self.nombres), dtype=np.int64, count=n)
+        inicio_filas = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(grados, out=inicio_filas[1:])
+        indice = self.indice
+        destinos = [indice[vecino] for v in self.nombres for vecino in self.vertices[v]]
+        pesos = [peso for v in self.nombres for peso in self.vertices[v].values()]
+        # Listas de Python: el acceso elemento a elemento es más rápido que con arreglos NumPy
+        self.csr = (inicio_filas.tolist(), destinos, pesos)
+        # Arreglos reutilizados entre consultas; solo se reinician las posiciones visitadas
+        self.distancia = [float('inf')] * n
+        self.predecesor = [-1] * n
+        return self.csr
 
     def dijkstra(self, inicio, fin):
-        distancia = {vertice: float('inf') for vertice in self.vertices}  # Inicializar las distancias a cada vértice como infinito
-        distancia[inicio] = 0  # La distancia al inicio es 0
-        cola = [(0, inicio, [])]  # Inicializar una cola de prioridad con la distancia acumulada, el vértice actual y el camino recorrido
+        return self.ruta_mas_corta(inicio, fin)[0]
+
+    def ruta_mas_corta(self, inicio, fin, pesos=None):
+        # Devuelve (camino, tiempo total). Con pesos se usan esos pesos (alineados con el CSR)
+        # en lugar de los de las aristas, p. ej. los dependientes de la hora de salida
+        if inicio not in self.indice or fin not in self.indice:
+            return [], float('inf')
+        inicio_filas, destinos, pesos_csr = self.csr or self.construir_csr()
+        if pesos is None:
+            pesos = pesos_csr
+        distancia = self.distancia
+        predecesor = self.predecesor
+        origen = self.indice[inicio]
+        objetivo = self.indice[fin]
+
+        distancia[origen] = 0
+        tocados = [origen]  # Vértices cuya distancia se modificó, para reiniciarlos al final
+        cola = [(0, origen)]  # Cola de prioridad con la distancia acumulada y el vértice
+        encontrado = False
         while cola:
-            distancia_actual, vertice_actual, camino = heapq.heappop(cola)  # Obtener el vértice más cercano de la cola
-            if distancia_actual > distancia[vertice_actual]:
-                continue  # Si ya se encontró un camino más corto, ignorar este vértice
-            camino = camino + [vertice_actual]  # Agregar el vértice actual al camino recorrido
-            if vertice_actual == fin:
-                return camino  # Si se llega al destino, devolver el camino recorrido
-            for vecino, peso_arista in self.vertices[vertice_actual].items():
-                distancia_total = distancia_actual + peso_arista  # Calcular la distancia total hasta el vecino
-                if distancia_total < distancia[vecino]:
-                    distancia[vecino] = distancia_total  # Actualizar la distancia al vecino
-                    heapq.heappush(cola, (distancia_total, vecino, camino))  # Agregar el vecino a la cola con su distancia acumulada
-        return []  # Si no se encontró un camino al destino, devolver una lista vacía
+            distancia_actual, u = heapq.heappop(cola)
+            if distancia_actual > distancia[u]:
+                continue  # Entrada obsoleta: ya se encontró un camino más corto
+            if u == objetivo:
+                encontrado = True
+                break
+            for i in range(inicio_filas[u], inicio_filas[u + 1]):
+                v = destinos[i]
+                distancia_total = distancia_actual + pesos[i]
+                if distancia_total < distancia[v]:
+                    if distancia[v] == float('inf'):
+                        tocados.append(v)
+                    distancia[v] = distancia_total
+                    predecesor[v] = u
+                    heapq.heappush(cola, (distancia_total, v))
+
+        # Reconstruir el camino una sola vez siguiendo los predecesores
+        camino = []
+        tiempo = distancia[objetivo]
+        if encontrado:
+            u = objetivo
+            while u != origen:
+                camino.append(self.nombres[u])
+                u = predecesor[u]
+            camino.append(inicio)
+            camino.reverse()
+
+        for u in tocados:
+            distancia[u] = float('inf')
+            predecesor[u] = -1
+        return camino, tiempo  # Lista vacía e infinito si no hay camino al destino
+
+    def tiempo_ruta(self, camino):
+        # Sumar los pesos reales de las aristas recorridas
+        return sum(self.vertices[a][b] for a, b in zip(camino, camino[1:]))
 
     def graficar_recorrido(self, recorrido):
         G = nx.DiGraph()  # Crear un grafo dirigido
@@ -53,43 +119,47 @@ class Grafo:
         plt.title('Recorrido')  # Establecer el título del gráfico
         plt.show()  # Mostrar el gráfico
 
-# Crear una instancia de la clase Grafo
-grafo = Grafo()
-
-# Definir las estaciones y agregarlas como vértices al grafo
-estaciones = ["portal norte", "calle 200", "toberín", "mazurén", "pepe sierra", "calle 161", "calle 146", "calle 142"]
-for estacion in estaciones:
-    grafo.agregar_vertice(estacion)
-
-# Agregar las aristas que representan las conexiones entre las estaciones
-grafo.agregar_arista("portal norte", "calle 200", 5)
-grafo.agregar_arista("portal norte", "toberín", 7)
-grafo.agregar_arista("calle 200", "toberín", 3)
-grafo.agregar_arista("calle 200", "mazurén", 4)
-grafo.agregar_arista("toberín", "mazurén", 2)
-grafo.agregar_arista("toberín", "pepe sierra", 5)
-grafo.agregar_arista("mazurén", "pepe sierra", 3)
-grafo.agregar_arista("mazurén", "calle 161", 6)
-grafo.agregar_arista("pepe sierra", "calle 161", 2)
-grafo.agregar_arista("calle 161", "calle 146", 3)
-grafo.agregar_arista("calle 146", "calle 142", 2)
-
-# Imprimir las estaciones disponibles
-print("Estaciones disponibles:")
-for estacion in estaciones:
-    print(estacion)
-
-# Solicitar al usuario el punto de partida y el destino
-inicio = input("Ingrese el punto de partida: ").strip().lower()
-fin = input("Ingrese el destino: ").strip().lower()
-
-# Encontrar la mejor ruta utilizando el algoritmo de Dijkstra
-mejor_ruta = grafo.dijkstra(inicio, fin)
-
-# Imprimir la mejor ruta y su tiempo estimado
-print(f"El mejor tiempo para llegar de {inicio.capitalize()} a {fin.capitalize()} es: {len(mejor_ruta) - 1} minutos.")
-print("Recorrido:")
-print(" -> ".join(mejor_ruta))
-
-# Graficar el recorrido encontrado
-grafo.graficar_recorrido(mejor_ruta)
+if __name__ == "__main__":
+    from indiceRutas import IndiceRutas
+
+    # Crear una instancia de la clase Grafo
+    grafo = Grafo()
+
+    # Definir las estaciones y agregarlas como vértices al grafo
+    estaciones = ["portal norte", "calle 200", "toberín", "mazurén", "pepe sierra", "calle 161", "calle 146", "calle 142"]
+    for estacion in estaciones:
+        grafo.agregar_vertice(estacion)
+
+    # Agregar las aristas que representan las conexiones entre las estaciones
+    grafo.agregar_arista("portal norte", "calle 200", 5)
+    grafo.agregar_arista("portal norte", "toberín", 7)
+    grafo.agregar_arista("calle 200", "toberín", 3)
+    grafo.agregar_arista("calle 200", "mazurén", 4)
+    grafo.agregar_arista("toberín", "mazurén", 2)
+    grafo.agregar_arista("toberín", "pepe sierra", 5)
+    grafo.agregar_arista("mazurén", "pepe sierra", 3)
+    grafo.agregar_arista("mazurén", "calle 161", 6)
+    grafo.agregar_arista("pepe sierra", "calle 161", 2)
+    grafo.agregar_arista("calle 161", "calle 146", 3)
+    grafo.agregar_arista("calle 146", "calle 142", 2)
+
+    # Imprimir las estaciones disponibles
+    print("Estaciones disponibles:")
+    for estacion in estaciones:
+        print(estacion)
+
+    # Solicitar al usuario el punto de partida y el destino
+    inicio = input("Ingrese el punto de partida: ").strip().lower()
+    fin = input("Ingrese el destino: ").strip().lower()
+
+    # Encontrar la mejor ruta y su tiempo total (suma de los pesos de las aristas)
+    indice = IndiceRutas(grafo)
+    mejor_ruta, tiempo = indice.ruta(inicio, fin)
+
+    # Imprimir la mejor ruta y su tiempo estimado
+    print(f"El mejor tiempo para llegar de {inicio.capitalize()} a {fin.capitalize()} es: {tiempo} minutos.")
+    print("Recorrido:")
+    print(" -> ".join(mejor_ruta))
+
+    # Graficar el recorrido encontrado
+    grafo.graficar_recorrido(mejor_ruta)
@@ -4,6 +4,10 @@ import json
 import os
 import csv
 from datetime import datetime
+from risk_engine import RiskEngine
+from symbol_constraints import get_constraints, stops_valid
+from equity_monitor import EquityMonitor
+from execution_stats import send_order, get_deviation, get_filling_mode
 
 # ----------------------------
 # Configuraciones y constantes
@@ -11,22 +15,38 @@ from datetime import datetime
 CONFIG_FILE = "config.json"
 EQUITY_LOG_FILE = "equity_log.csv"
 BALANCE_LOG_FILE = "balance_log.csv"
+EQUITY_STATE_FILE = "equity_state_bridge.json"
 symbols_to_trade = ["BTCUSDm", "XAUUSDm"]
 default_lot = 0.05
 max_open_positions = 4
+magic_number = 123456
+min_distance_points = 100  # distancia mínima de SL/TP en validación manual (TF 1 y 5)
+min_equity_ratio = 0.4  # no abrir operaciones si el equity cae por debajo del 40% del capital inicial
+
+# Motor de riesgo: tamaño de lote normalizado y límites de cartera en O(1) por orden
+# Solo cuentan las posiciones abiertas por el bridge (su número mágico), como antes del motor
+risk_engine = RiskEngine(max_positions=max_open_positions, magic=magic_number)
+
+# Monitor de equity en segundo plano (solo mientras el proceso mantiene la conexión abierta)
+equity_monitor = None
+
+# Capital inicial leído de config.json la primera vez que se necesita
+initial_capital_cache = None
 
 # ----------------------------
 # Obtener o inicializar el capital inicial
 # ----------------------------
 def get_initial_capital():
+    global initial_capital_cache
+    if initial_capital_cache is not None:
+        return initial_capital_cache
     if os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, "r") as f:
             config = json.load(f)
-        return config.get("initial_capital")
+        initial_capital_cache = config.get("initial_capital")
+        return initial_capital_cache
     else:
-        if not mt5.initialize():
-            print(f"❌ Error inicializando MT5 para leer capital inicial: {mt5.last_error()}")
-            return 1000.0
+        # Se asume una conexión MT5 ya inicializada por quien llama
         account_info = mt5.account_info()
         if account_info is None:
             print("❌ No se pudo obtener información de la cuenta para capital inicial.")
@@ -34,9 +54,28 @@ def get_initial_capital():
         initial_capital = account_info.balance
         with open(CONFIG_FILE, "w") as f:
             json.dump({"initial_capital": initial_capital}, f)
-        mt5.shutdown()
+        initial_capital_cache = initial_capital
         return initial_capital
 
+# ----------------------------
+# Iniciar el monitor de equity sobre una conexión MT5 ya inicializada
+# ----------------------------
+def iniciar_monitor(state_file=EQUITY_STATE_FILE):
+    global equity_monitor
+    if equity_monitor is None:
+        # El capital inicial se lee una sola vez; luego lo conserva el estado del monitor
+        equity_monitor = EquityMonitor(state_file=state_file, min_equity_ratio=min_equity_ratio,
+                                       initial_balance=get_initial_capital())
+        equity_monitor.start()
+    return equity_monitor
+
+
+def detener_monitor():
+    global equity_monitor
+    if equity_monitor is not None:
+        equity_monitor.stop()
+        equity_monitor = None
+
 # ----------------------------
 # Registrar equity en CSV
 # ----------------------------
@@ -59,40 +98,58 @@ def log_balance(balance):
 # Enviar orden para los símbolos definidos
 # ----------------------------
 def send_order_for_symbols(signal, entry, sl, tp, tf=None, symbol=None):
-    results = []
+    # Con el monitor activo el proceso ya mantiene la conexión abierta
+    if equity_monitor is not None:
+        return ejecutar_senal(signal, entry, sl, tp, tf, symbol)
 
     if not mt5.initialize():
         error_msg = f"❌ Error inicializando MT5: {mt5.last_error()}"
         print(error_msg)
         return [error_msg]
 
-    account_info = mt5.account_info()
-    if account_info is None:
+    try:
+        return ejecutar_senal(signal, entry, sl, tp, tf, symbol)
+    finally:
         mt5.shutdown()
-        error_msg = "❌ No se pudo obtener la información de la cuenta."
-        print(error_msg)
-        return [error_msg]
 
-    equity = account_info.equity
-    balance = account_info.balance
+# ----------------------------
+# Ejecutar una señal sobre una conexión MT5 ya inicializada
+# ----------------------------
+def ejecutar_senal(signal, entry, sl, tp, tf=None, symbol=None, lot=default_lot, max_positions=max_open_positions):
+    results = []
+
+    if equity_monitor is not None:
+        # Corte por equity: bandera mantenida por el hilo del monitor, sin consultar la cuenta
+        if not equity_monitor.trading_allowed:
+            msg = f"🛑 Operativa detenida ({equity_monitor.reason}). No se abrirán más operaciones."
+            print(msg)
+            return [msg]
+        equity = equity_monitor.state["equity"]
+        balance = equity_monitor.state["balance"]
+    else:
+        account_info = mt5.account_info()
+        if account_info is None:
+            error_msg = "❌ No se pudo obtener la información de la cuenta."
+            print(error_msg)
+            return [error_msg]
+        equity = account_info.equity
+        balance = account_info.balance
+
+        # Sin monitor (p. ej. la app servida por WSGI) se aplica el mismo corte consultando la cuenta
+        initial_capital = get_initial_capital()
+        if equity < initial_capital * min_equity_ratio:
+            msg = f"🛑 Equity actual (${equity:.2f}) por debajo del {min_equity_ratio:.0%} del capital inicial (${initial_capital:.2f}). No se abrirán más operaciones."
+            print(msg)
+            return [msg]
 
     log_equity(equity)
     log_balance(balance)
 
-    initial_capital = get_initial_capital()
-    equity_threshold = initial_capital * 0.4
-
-    # if equity <= equity_threshold:
-    #     mt5.shutdown()
-    #     msg = f"🛑 Equity actual (${equity:.2f}) ha bajado más del 60% del capital inicial (${initial_capital:.2f}). No se abrirán más operaciones."
-    #     print(msg)
-    #     return [msg]
-
-    positions = mt5.positions_get()
-    current_open_lots = sum(pos.volume for pos in positions if pos.volume == default_lot) if positions else 0
-    if current_open_lots >= (max_open_positions * default_lot):
-        mt5.shutdown()
-        msg = f"🚫 Ya hay {int(current_open_lots / default_lot)} operaciones de {default_lot} lotes abiertas. Máximo permitido: {max_open_positions}."
+    # Límites de cartera: el libro de exposición se reconcilia con el terminal cada cierto tiempo
+    risk_engine.max_positions = max_positions
+    risk_engine.sync()
+    if risk_engine.book.total_positions >= max_positions:
+        msg = f"🚫 Ya hay {risk_engine.book.total_positions} operaciones abiertas. Máximo permitido: {max_positions}."
         print(msg)
         return [msg]
 
@@ -104,22 +161,31 @@ def send_order_for_symbols(signal, entry, sl, tp, tf=None, symbol=None):
     symbols = [symbol] if symbol else symbols_to_trade
 
     for symbol in symbols:
-        symbol_info = mt5.symbol_info(symbol)
-        if symbol_info is None:
-            msg = f"❌ Símbolo '{symbol}' no encontrado."
+        # Restricciones del símbolo (cacheadas): punto, stops_level, volumen, modo de llenado
+        constraints = get_constraints(symbol)
+        if constraints is None:
+            msg = f"❌ Símbolo '{symbol}' no encontrado o no se pudo activar."
             print(msg)
             results.append(msg)
             continue
 
-        if not symbol_info.visible:
-            if not mt5.symbol_select(symbol, True):
-                msg = f"❌ No se pudo activar el símbolo '{symbol}'."
-                print(msg)
-                results.append(msg)
-                continue
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            msg = f"❌ {symbol}: no se pudo obtener el precio actual."
+            print(msg)
+            results.append(msg)
+            continue
+
+        volume = risk_engine.normalize_volume(symbol, lot)
+        allowed, reason = risk_engine.can_open(symbol, volume)
+        if not allowed:
+            msg = f"🚫 {symbol}: orden no enviada ({reason})."
+            print(msg)
+            results.append(msg)
+            continue
 
         order_type = mt5.ORDER_TYPE_BUY if signal == "BUY" else mt5.ORDER_TYPE_SELL
-        current_price = symbol_info.ask if signal == "BUY" else symbol_info.bid
+        current_price = tick.ask if signal == "BUY" else tick.bid
 
         sl_diff = abs(current_price - sl)
         tp_diff = abs(tp - current_price)
@@ -127,47 +193,40 @@ def send_order_for_symbols(signal, entry, sl, tp, tf=None, symbol=None):
         new_tp = current_price + tp_diff if signal == "BUY" else current_price - tp_diff
 
         if usar_validacion_manual:
-            min_distance_points = 100
-            min_distance_price = min_distance_points * symbol_info.point
             print(f"⏱️ TF: {tf} | {symbol} → Validación manual activa")
 
-            if signal == "BUY":
-                if (current_price - new_sl) < min_distance_price or (new_tp - current_price) < min_distance_price:
-                    msg = f"❌ SL o TP muy cercanos para {symbol} en BUY."
-                    print(msg)
-                    results.append(msg)
-                    continue
-            else:
-                if (new_sl - current_price) < min_distance_price or (current_price - new_tp) < min_distance_price:
-                    msg = f"❌ SL o TP muy cercanos para {symbol} en SELL."
-                    print(msg)
-                    results.append(msg)
-                    continue
+            if not stops_valid(constraints, signal, current_price, new_sl, new_tp, min_points=min_distance_points):
+                msg = f"❌ SL o TP muy cercanos para {symbol} en {signal}."
+                print(msg)
+                results.append(msg)
+                continue
         else:
             print(f"⏱️ TF: {tf} | {symbol} → Sin validación manual")
 
         request = {
             "action": mt5.TRADE_ACTION_DEAL,
             "symbol": symbol,
-            "volume": default_lot,
+            "volume": volume,
             "type": order_type,
             "price": current_price,
             "sl": new_sl,
             "tp": new_tp,
-            "deviation": 20,
-            "magic": 123456,
+            "deviation": get_deviation(symbol),
+            "magic": magic_number,
             "comment": f"{signal} auto",
             "type_time": mt5.ORDER_TIME_GTC,
-            "type_filling": mt5.ORDER_FILLING_IOC,
+            "type_filling": get_filling_mode(symbol, constraints),
         }
 
-        result = mt5.order_send(request)
+        # Envío cronometrado: latencia, deslizamiento y rechazos quedan en logs/executions.csv
+        result = send_order(request)
 
         if result is None:
             error_code = mt5.last_error()
             msg = f"❌ {symbol}: error al enviar la orden. Sin respuesta de MT5. Último error: {error_code}"
         else:
             if result.retcode == mt5.TRADE_RETCODE_DONE:
+                risk_engine.record_fill(symbol, result.volume, result.order)
                 msg = f"✅ {symbol}: orden {signal} enviada correctamente. Precio: {current_price:.2f}, SL: {new_sl:.2f}, TP: {new_tp:.2f}"
             else:
                 msg = f"❌ {symbol}: error al enviar la orden. Código: {result.retcode}"
@@ -176,5 +235,4 @@ def send_order_for_symbols(signal, entry, sl, tp, tf=None, symbol=None):
         print(f"🧾 Resultado: {msg}")
         results.append(msg)
 
-    mt5.shutdown()
     return results
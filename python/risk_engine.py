@@ -0,0 +1,149 @@
+import MetaTrader5 as mt5
+import numpy as np
+import time
+import logging
+from collections import defaultdict
+from symbol_constraints import get_constraints
+
+logger = logging.getLogger(__name__)
+
+SYNC_INTERVAL = 30  # seconds between reconciliations with the terminal
+
+
+class ExposureBook:
+    """Open exposure per symbol and in total, updated incrementally on fills."""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.tickets = {}
+        self.symbol_lots = defaultdict(float)
+        self.symbol_positions = defaultdict(int)
+        self.total_lots = 0.0
+        self.total_positions = 0
+
+    def add(self, symbol, volume, ticket=None):
+        if ticket is not None:
+            if ticket in self.tickets:
+                return
+            self.tickets[ticket] = (symbol, volume)
+        self.symbol_lots[symbol] += volume
+        self.symbol_positions[symbol] += 1
+        self.total_lots += volume
+        self.total_positions += 1
+
+    def remove(self, ticket):
+        entry = self.tickets.pop(ticket, None)
+        if entry is None:
+            return
+        symbol, volume = entry
+        self.symbol_lots[symbol] -= volume
+        self.symbol_positions[symbol] -= 1
+        self.total_lots -= volume
+        self.total_positions -= 1
+
+    def load(self, positions):
+        """Rebuild the book from a positions_get() snapshot."""
+        self.clear()
+        for pos in positions or ():
+            self.add(pos.symbol, pos.volume, pos.ticket)
+
+
+class RiskEngine:
+    """Position sizing from symbol specifications plus O(1) portfolio limit checks.
+
+    Limits left as None are not enforced. With magic set, only positions opened with that
+    magic number count towards the limits.
+    """
+
+    def __init__(self, risk_per_trade=0.01, max_positions=None, max_total_lots=None,
+                 max_symbol_lots=None, max_symbol_positions=None, sync_interval=SYNC_INTERVAL, magic=None):
+        self.risk_per_trade = risk_per_trade
+        self.max_positions = max_positions
+        self.max_total_lots = max_total_lots
+        self.max_symbol_lots = max_symbol_lots
+        self.max_symbol_positions = max_symbol_positions
+        self.sync_interval = sync_interval
+        self.magic = magic
+        self.book = ExposureBook()
+        self.last_sync = 0.0
+
+    # --- Symbol specifications ---
+
+    def spec(self, symbol):
+        spec = get_constraints(symbol)
+        if spec is None:
+            raise ValueError(f"Symbol info not available for {symbol}")
+        return spec
+
+    # --- Sizing ---
+
+    @staticmethod
+    def _round_volume(volume, step, vmin, vmax):
+        """Round down to the volume step; below the minimum the order is not sized (0)."""
+        volume = np.floor(np.asarray(volume, dtype=float) / step + 1e-9) * step
+        volume = np.minimum(volume, vmax)
+        return np.where(volume >= vmin, np.round(volume, 8), 0.0)
+
+    def normalize_volume(self, symbol, volume):
+        spec = self.spec(symbol)
+        return float(self._round_volume(volume, spec["volume_step"], spec["volume_min"], spec["volume_max"]))
+
+    def size_order(self, symbol, balance, price, sl, risk=None):
+        """Volume that loses `risk` of the balance if the stop loss is hit."""
+        return float(self.size_batch([symbol], balance, [price], [sl], risk)[0])
+
+    def size_batch(self, symbols, balance, prices, sls, risk=None):
+        """Size several candidate orders in one vectorized pass."""
+        risk = self.risk_per_trade if risk is None else risk
+        specs = [self.spec(symbol) for symbol in symbols]
+        tick_size = np.array([s["tick_size"] for s in specs])
+        tick_value = np.array([s["tick_value"] for s in specs])
+        step = np.array([s["volume_step"] for s in specs])
+        vmin = np.array([s["volume_min"] for s in specs])
+        vmax = np.array([s["volume_max"] for s in specs])
+
+        stop_distance = np.abs(np.asarray(prices, dtype=float) - np.asarray(sls, dtype=float))
+        loss_per_lot = stop_distance / tick_size * tick_value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            volume = np.where(loss_per_lot > 0, balance * risk / loss_per_lot, 0.0)
+        return self._round_volume(volume, step, vmin, vmax)
+
+    # --- Portfolio limits ---
+
+    def sync(self, positions=None, force=False):
+        """Reconcile the book with the terminal (catches SL/TP closes) on a slow cadence."""
+        now = time.monotonic()
+        if not force and positions is None and now - self.last_sync < self.sync_interval:
+            return
+        if positions is None:
+            positions = mt5.positions_get()
+            if positions is None:
+                logger.error(f"Failed to fetch positions: {mt5.last_error()}")
+                return
+        if self.magic is not None:
+            positions = [pos for pos in positions if pos.magic == self.magic]
+        self.book.load(positions)
+        self.last_sync = now
+
+    def can_open(self, symbol, volume):
+        """Check an order against the limits. Returns (allowed, reason)."""
+        book = self.book
+        if volume <= 0:
+            return False, "volume below the symbol minimum"
+        if self.max_positions is not None and book.total_positions >= self.max_positions:
+            return False, f"max open positions reached ({book.total_positions}/{self.max_positions})"
+        if self.max_total_lots is not None and book.total_lots + volume > self.max_total_lots + 1e-9:
+            return False, f"max total lots exceeded ({book.total_lots + volume:.2f}/{self.max_total_lots})"
+        if self.max_symbol_positions is not None and book.symbol_positions[symbol] >= self.max_symbol_positions:
+            return False, f"max positions for {symbol} reached ({self.max_symbol_positions})"
+        if self.max_symbol_lots is not None and book.symbol_lots[symbol] + volume > self.max_symbol_lots + 1e-9:
+            return False, f"max lots for {symbol} exceeded ({self.max_symbol_lots})"
+        return True, ""
+
+    def record_fill(self, symbol, volume, ticket=None):
+        self.book.add(symbol, volume, ticket)
+
+    def record_close(self, ticket):
+        self.book.remove(ticket)
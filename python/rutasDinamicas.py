@@ -0,0 +1,52 @@
+# Rutas con pesos dependientes de la hora de salida, a partir del modelo de tiempos de viaje.
+#
+# El modelo de entrenarModelo predice el tiempo entre estaciones según la hora, el día y el
+# clima (no según la arista), así que se usa como factor sobre el peso base de cada arista:
+#   peso(arista, franja) = peso_base(arista) * prediccion(franja) / media(predicciones)
+# Todas las franjas se predicen en un solo lote y los pesos de cada franja se
+# cachean como una lista alineada con el CSR del grafo.
+import itertools
+
+import numpy as np
+
+HORAS = range(24)
+DIAS = range(7)
+CONDICIONES = ("soleado", "lluvioso", "nublado")
+
+
+class PesosDinamicos:
+    def __init__(self, grafo, servidor, condiciones=CONDICIONES):
+        self.grafo = grafo
+        self.servidor = servidor  # servirModelo.ServidorModelo
+        self.condiciones = condiciones
+        self.factores = None  # (hora, dia, condiciones) -> factor sobre el peso base
+        self.cache = {}  # (hora, dia, condiciones) -> lista de pesos alineada con el CSR
+        self.version = None
+
+    def precalcular(self):
+        # Una sola predicción para todas las franjas (24 horas x 7 días x condiciones)
+        franjas = list(itertools.product(HORAS, DIAS, self.condiciones))
+        horas, dias, condiciones = zip(*franjas)
+        predicciones = self.servidor.predecir_lote(horas, dias, condiciones)
+        factores = predicciones / predicciones.mean()
+        self.factores = dict(zip(franjas, factores.tolist()))
+        self.cache = {}
+
+    def pesos(self, hora, dia, condiciones):
+        # Pesos de todas las aristas para la franja dada, calculados una vez y cacheados
+        if self.grafo.version != self.version:
+            self.cache = {}
+            self.version = self.grafo.version
+        clave = (hora, dia, condiciones)
+        pesos = self.cache.get(clave)
+        if pesos is None:
+            if self.factores is None:
+                self.precalcular()
+            _, _, pesos_base = self.grafo.csr or self.grafo.construir_csr()
+            pesos = (np.asarray(pesos_base, dtype=float) * self.factores[clave]).tolist()
+            self.cache[clave] = pesos
+        return pesos
+
+    def ruta(self, inicio, fin, hora, dia, condiciones):
+        # Mejor ruta saliendo a la hora indicada: (camino, tiempo total)
+        return self.grafo.ruta_mas_corta(inicio, fin, self.pesos(hora, dia, condiciones))
@@ -0,0 +1,97 @@
+# Servidor del modelo de tiempos de viaje: carga el modelo persistido una sola vez y
+# predice lotes completos (NumPy o DataFrame) con inferencia paralela.
+#
+# La codificación de las condiciones meteorológicas usa un mapa de columnas precalculado,
+# así que no se reconstruyen columnas dummy en cada llamada.
+#
+# Uso: python servirModelo.py [filas_del_lote]   (benchmark filas/s individual vs. lote)
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from entrenarModelo import ARCHIVO_MODELO
+
+UMBRAL_PARALELO = 1000  # Filas a partir de las cuales compensa repartir los árboles entre núcleos
+
+
+class ServidorModelo:
+    def __init__(self, archivo=ARCHIVO_MODELO, n_jobs=-1):
+        datos = joblib.load(archivo)
+        self.modelo = datos['modelo']
+        self.n_jobs = n_jobs
+        self.columnas = datos['columnas']
+        self.condiciones = datos['condiciones']
+        posicion = {columna: i for i, columna in enumerate(self.columnas)}
+        self.columna_hora = posicion['hora_del_dia']
+        self.columna_dia = posicion['dia_de_la_semana']
+        # Condición -> índice de su columna dummy (-1 para la categoría de referencia)
+        self.mapa_condiciones = {
+            condicion: posicion.get(f'condiciones_meteorologicas_{condicion}', -1)
+            for condicion in self.condiciones
+        }
+
+    def codificar(self, horas, dias, condiciones):
+        # Construir la matriz de características de un lote sin pasar por get_dummies
+        horas = np.asarray(horas)
+        X = np.zeros((len(horas), len(self.columnas)))
+        X[:, self.columna_hora] = horas
+        X[:, self.columna_dia] = dias
+        columnas = np.array([self.mapa_condiciones[c] for c in condiciones])
+        filas = np.flatnonzero(columnas >= 0)
+        X[filas, columnas[filas]] = 1
+        return X
+
+    def predecir_lote(self, horas, dias, condiciones):
+        return self.predecir_matriz(self.codificar(horas, dias, condiciones))
+
+    def predecir_matriz(self, X):
+        # En lotes pequeños el costo de arrancar los hilos supera al de evaluar los árboles
+        self.modelo.n_jobs = self.n_jobs if len(X) >= UMBRAL_PARALELO else 1
+        return self.modelo.predict(pd.DataFrame(X, columns=self.columnas))
+
+    def predecir(self, datos):
+        # Acepta un DataFrame con columnas hora_del_dia, dia_de_la_semana y
+        # condiciones_meteorologicas, o una matriz NumPy ya codificada con self.columnas
+        if isinstance(datos, pd.DataFrame):
+            return self.predecir_lote(datos['hora_del_dia'], datos['dia_de_la_semana'],
+                                      datos['condiciones_meteorologicas'])
+        return self.predecir_matriz(np.asarray(datos))
+
+    def predecir_uno(self, hora, dia, condiciones):
+        return self.predecir_lote([hora], [dia], [condiciones])[0]
+
+
+_servidor = None
+
+
+def obtener_servidor():
+    # Instancia compartida, cargada en el primer uso
+    global _servidor
+    if _servidor is None:
+        _servidor = ServidorModelo()
+    return _servidor
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    servidor = obtener_servidor()
+    rng = np.random.default_rng(0)
+    horas = rng.integers(0, 24, filas)
+    dias = rng.integers(0, 7, filas)
+    condiciones = rng.choice(servidor.condiciones, filas)
+
+    muestras = min(filas, 200)
+    inicio = time.perf_counter()
+    for i in range(muestras):
+        servidor.predecir_uno(horas[i], dias[i], condiciones[i])
+    individual = muestras / (time.perf_counter() - inicio)
+
+    inicio = time.perf_counter()
+    servidor.predecir_lote(horas, dias, condiciones)
+    lote = filas / (time.perf_counter() - inicio)
+
+    print(f"Individual: {individual:12,.0f} filas/s")
+    print(f"Lote:       {lote:12,.0f} filas/s ({filas} filas, x{lote / individual:.0f})")
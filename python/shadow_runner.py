@@ -0,0 +1,345 @@
+# Shadow (paper) trading runner.
+#
+# Several strategy instances share one tick feed, one bar cache and one indicator pass per
+# closed bar. At most one strategy is live and sends orders through autoTrade's risk-sized
+# order path; every other strategy fills on bar prices and records its trades and PnL in the
+# trade journal, so a new variant only costs its decision logic.
+#
+# Paper fills use the closing price of the bar that produced the signal; SL/TP are checked
+# against the high/low of later bars (SL first when both are hit in the same bar). Each paper
+# strategy holds at most one position per symbol. Live strategies exit through their SL/TP.
+#
+# Usage: python shadow_runner.py [--live STRATEGY_NAME]
+import MetaTrader5 as mt5
+import logging
+import sys
+
+import autoTrade
+from autoTrade import BAR_CACHE, EQUITY_MONITOR, RISK_ENGINE, TIMEFRAME_MAP, ANALYSIS_BARS
+from symbol_constraints import get_constraints, adjust_stops
+from tick_feed import TickFeed
+from trade_journal import TradeJournal
+
+logger = logging.getLogger(__name__)
+
+MIN_BARS = 20
+
+
+# --- Indicators (computed once per closed bar and parameter set) ---
+
+def sma(df, window):
+    from ta.trend import SMAIndicator
+    return SMAIndicator(close=df['close'], window=window).sma_indicator()
+
+
+def rsi(df, window):
+    from ta.momentum import RSIIndicator
+    return RSIIndicator(close=df['close'], window=window).rsi()
+
+
+def ema(df, span):
+    return df['close'].ewm(span=span).mean()
+
+
+def rsi_sma(df, window):
+    """RSI with simple moving averages of gains and losses, as in the TradingView bot."""
+    delta = df['close'].diff()
+    avg_gain = delta.clip(lower=0).rolling(window=window).mean()
+    avg_loss = (-delta.clip(upper=0)).rolling(window=window).mean()
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def range_atr(df, window):
+    """The TradingView bot's ATR: its true range uses the bar's own close, which reduces to high - low."""
+    return (df['high'] - df['low']).rolling(window=window).mean()
+
+
+INDICATORS = {
+    "sma": sma,
+    "rsi": rsi,
+    "ema": ema,
+    "rsi_sma": rsi_sma,
+    "range_atr": range_atr,
+}
+
+
+class IndicatorCache:
+    """Shares indicator series between strategies: each (indicator, parameter) is computed once per bar."""
+
+    def __init__(self):
+        self.bar_time = {}  # (symbol, tf_name) -> time of the last bar computed
+        self.series = {}  # (symbol, tf_name) -> {(indicator, parameter): values}
+
+    def frame(self, symbol, tf_name, bars, columns):
+        """Shallow copy of `bars` with the requested columns ({name: (indicator, parameter)})."""
+        key = (symbol, tf_name)
+        last_time = int(bars['time'].iloc[-1])
+        if self.bar_time.get(key) != last_time:
+            self.bar_time[key] = last_time
+            self.series[key] = {}
+        computed = self.series[key]
+
+        df = bars.copy(deep=False)
+        for name, spec in columns.items():
+            if spec not in computed:
+                indicator, parameter = spec
+                computed[spec] = INDICATORS[indicator](bars, parameter).to_numpy()
+            df[name] = computed[spec]
+        return df
+
+
+# --- Strategies: decision logic only ---
+
+class Strategy:
+    """Base class. decide() returns None or {"direction": "BUY"/"SELL", "stops": price -> (sl, tp)}."""
+
+    close_on_reverse = False
+
+    def __init__(self, name, symbols, columns, lot=0.05):
+        self.name = name
+        self.symbols = symbols  # symbol -> tf_name
+        self.columns = columns  # column -> (indicator, parameter)
+        self.lot = lot
+
+    def decide(self, symbol, tf_name, df, constraints):
+        raise NotImplementedError
+
+    def volume(self, symbol, price, sl, balance):
+        return RISK_ENGINE.normalize_volume(symbol, self.lot)
+
+
+class ModelStrategy(Strategy):
+    """The autoTrade strategy: XGBoost confidence gate plus the scalping/trend rules."""
+
+    def __init__(self, name="autotrade_ml", symbols=None, min_confidence=autoTrade.MIN_CONFIDENCE):
+        super().__init__(name, symbols or dict(autoTrade.SYMBOL_CONFIG), {
+            "sma_14": ("sma", 14),
+            "rsi_14": ("rsi", 14),
+            "ema_fast": ("ema", 5),
+            "ema_slow": ("ema", 13),
+        })
+        self.min_confidence = min_confidence
+
+    def decide(self, symbol, tf_name, df, constraints):
+        model = autoTrade.get_model(symbol, tf_name)
+        df = df.dropna()
+        if model is None or len(df) < MIN_BARS:
+            return None
+        timeframe = TIMEFRAME_MAP[tf_name]
+        analysis = autoTrade.analyze(model, df, timeframe, min_confidence=self.min_confidence)
+        if not analysis["trade"]:
+            return None
+        direction = analysis["direction"]
+        support, resistance = analysis["support"], analysis["resistance"]
+        return {
+            "direction": direction,
+            "stops": lambda price: autoTrade.compute_stops(constraints, timeframe, direction, price, support, resistance),
+        }
+
+    def volume(self, symbol, price, sl, balance):
+        return RISK_ENGINE.size_order(symbol, balance, price, sl)
+
+
+class EmaRsiAtrStrategy(Strategy):
+    """The EMA/RSI/ATR rules of bot-based-tradingview-strategy.py, with tunable parameters."""
+
+    close_on_reverse = True
+
+    def __init__(self, name="ema_rsi_atr", symbols=None, ema_short=11, ema_long=21, rsi_length=14,
+                 rsi_overbought=70, rsi_oversold=30, atr_length=14, sl_mult=1.5, tp_mult=3.0, lot=0.05):
+        super().__init__(name, symbols or {"XAUUSDm": "M15"}, {
+            "ema_short": ("ema", ema_short),
+            "ema_long": ("ema", ema_long),
+            "rsi": ("rsi_sma", rsi_length),
+            "atr": ("range_atr", atr_length),
+        }, lot=lot)
+        self.rsi_overbought = rsi_overbought
+        self.rsi_oversold = rsi_oversold
+        self.sl_mult = sl_mult
+        self.tp_mult = tp_mult
+
+    def decide(self, symbol, tf_name, df, constraints):
+        last = df.iloc[-1]
+        atr = last['atr']
+        if atr != atr:  # NaN: not enough bars yet
+            return None
+        if last['ema_short'] > last['ema_long'] and last['rsi'] < self.rsi_overbought:
+            direction = "BUY"
+        elif last['ema_short'] < last['ema_long'] and last['rsi'] > self.rsi_oversold:
+            direction = "SELL"
+        else:
+            return None
+        sign = 1 if direction == "BUY" else -1
+        return {
+            "direction": direction,
+            "stops": lambda price: adjust_stops(constraints, direction, price,
+                                                price - sign * atr * self.sl_mult, price + sign * atr * self.tp_mult),
+        }
+
+
+# --- Paper execution ---
+
+class PaperBroker:
+    """Simulated positions and PnL of one shadow strategy."""
+
+    def __init__(self, strategy_name, journal):
+        self.strategy_name = strategy_name
+        self.journal = journal
+        self.positions = {}  # symbol -> open position
+        self.realized = 0.0
+        self.trades = 0
+        self.wins = 0
+
+    def open(self, symbol, direction, volume, price, sl, tp, contract_size):
+        self.positions[symbol] = {
+            "direction": direction,
+            "volume": volume,
+            "entry": price,
+            "sl": sl,
+            "tp": tp,
+            "contract_size": contract_size,
+        }
+        self.journal.record(self.strategy_name, "shadow", symbol, "open", direction, volume, price, sl, tp)
+
+    def close(self, symbol, price, reason):
+        position = self.positions.pop(symbol)
+        sign = 1 if position["direction"] == "BUY" else -1
+        pnl = sign * (price - position["entry"]) * position["volume"] * position["contract_size"]
+        self.realized += pnl
+        self.trades += 1
+        self.wins += pnl > 0
+        self.journal.record(self.strategy_name, "shadow", symbol, "close", position["direction"], position["volume"],
+                            price, position["sl"], position["tp"], round(pnl, 2), reason)
+
+    def check_stops(self, symbol, bar):
+        """Close the position if the bar reached its SL or TP (SL first when both are inside the bar)."""
+        position = self.positions.get(symbol)
+        if position is None:
+            return
+        if position["direction"] == "BUY":
+            if bar['low'] <= position["sl"]:
+                self.close(symbol, position["sl"], "sl")
+            elif bar['high'] >= position["tp"]:
+                self.close(symbol, position["tp"], "tp")
+        else:
+            if bar['high'] >= position["sl"]:
+                self.close(symbol, position["sl"], "sl")
+            elif bar['low'] <= position["tp"]:
+                self.close(symbol, position["tp"], "tp")
+
+
+# --- Runner ---
+
+class ShadowRunner:
+    def __init__(self, strategies, live=None, journal=None):
+        self.strategies = strategies
+        self.live = live
+        self.journal = journal or TradeJournal()
+        self.indicators = IndicatorCache()
+        self.brokers = {s.name: PaperBroker(s.name, self.journal) for s in strategies if s.name != live}
+        self.subscriptions = {}  # (symbol, tf_name) -> strategies
+        for strategy in strategies:
+            for symbol, tf_name in strategy.symbols.items():
+                self.subscriptions.setdefault((symbol, tf_name), []).append(strategy)
+
+    def timeframes(self):
+        timeframes = {}
+        for symbol, tf_name in self.subscriptions:
+            timeframes.setdefault(symbol, []).append(tf_name)
+        return timeframes
+
+    def on_bar_close(self, symbol, tf_name, bar):
+        """One data and indicator pass per closed bar, shared by every subscribed strategy."""
+        timeframe = TIMEFRAME_MAP[tf_name]
+        if BAR_CACHE.update(symbol, timeframe) is None:
+            logger.error(f"Insufficient data for {symbol} ({tf_name})")
+            return
+        autoTrade.merge_closed_bar(symbol, timeframe, bar)
+        bars = BAR_CACHE.frame(symbol, timeframe, ANALYSIS_BARS, until=bar["time"])
+        constraints = get_constraints(symbol)
+        if len(bars) < MIN_BARS or constraints is None:
+            logger.error(f"Insufficient data for {symbol} ({tf_name})")
+            return
+
+        last_bar = bars.iloc[-1]
+        for strategy in self.subscriptions[(symbol, tf_name)]:
+            try:
+                self.step(strategy, symbol, tf_name, bars, last_bar, constraints)
+            except Exception:
+                logger.exception(f"[{strategy.name}] Failed on {symbol} ({tf_name})")
+        autoTrade.save_warm_state()
+
+    def step(self, strategy, symbol, tf_name, bars, last_bar, constraints):
+        df = self.indicators.frame(symbol, tf_name, bars, strategy.columns)
+        broker = self.brokers.get(strategy.name)
+        if broker is None:
+            self.execute_live(strategy, symbol, strategy.decide(symbol, tf_name, df, constraints), constraints)
+            return
+
+        broker.check_stops(symbol, last_bar)
+        decision = strategy.decide(symbol, tf_name, df, constraints)
+        position = broker.positions.get(symbol)
+        if position is not None:
+            if decision and strategy.close_on_reverse and decision["direction"] != position["direction"]:
+                broker.close(symbol, float(last_bar['close']), "reverse signal")
+            return
+        if decision is None:
+            return
+
+        price = float(last_bar['close'])
+        sl, tp = decision["stops"](price)
+        volume = strategy.volume(symbol, price, sl, EQUITY_MONITOR.balance)
+        broker.open(symbol, decision["direction"], volume, price, sl, tp, constraints["contract_size"])
+
+    def execute_live(self, strategy, symbol, decision, constraints):
+        if decision is None:
+            return
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None:
+            logger.error(f"Failed to fetch tick data for {symbol}")
+            return
+        direction = decision["direction"]
+        price = tick.ask if direction == "BUY" else tick.bid
+        sl, tp = decision["stops"](price)
+        result = autoTrade.place_order(symbol, direction, price, sl, tp, EQUITY_MONITOR.balance, constraints)
+        if result is not None and result.retcode == mt5.TRADE_RETCODE_DONE:
+            self.journal.record(strategy.name, "live", symbol, "open", direction, result.volume,
+                                result.price or price, sl, tp)
+
+    def report(self):
+        for name, broker in self.brokers.items():
+            win_rate = broker.wins / broker.trades if broker.trades else 0.0
+            logger.info(f"[{name}] Trades: {broker.trades} | Win rate: {win_rate:.0%} | "
+                        f"PnL: {broker.realized:.2f} | Open: {len(broker.positions)}")
+
+    def run(self):
+        if not mt5.initialize():
+            logger.error("Failed to initialize MT5")
+            return
+        EQUITY_MONITOR.start()
+        autoTrade.restore_warm_state()
+        feed = TickFeed(self.timeframes())
+        feed.subscribe(self.on_bar_close)
+        logger.info(f"Shadow runner started with {len(self.strategies)} strategies (live: {self.live or 'none'})")
+        try:
+            feed.run()
+        finally:
+            self.report()
+            autoTrade.save_warm_state()
+            EQUITY_MONITOR.stop()
+            mt5.shutdown()
+
+
+def default_strategies():
+    return [
+        ModelStrategy(),
+        ModelStrategy("autotrade_ml_c65", min_confidence=0.65),
+        EmaRsiAtrStrategy(),
+        EmaRsiAtrStrategy("ema_rsi_atr_8_17", ema_short=8, ema_long=17),
+        EmaRsiAtrStrategy("ema_rsi_atr_m5", symbols={"XAUUSDm": "M5", "BTCUSDm": "M5"}),
+    ]
+
+
+if __name__ == "__main__":
+    live = sys.argv[sys.argv.index("--live") + 1] if "--live" in sys.argv else None
+    ShadowRunner(default_strategies(), live=live).run()
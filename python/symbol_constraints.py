@@ -0,0 +1,117 @@
+import MetaTrader5 as mt5
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL = 60 * 60  # seconds; these values rarely change during a session
+DEFAULT_STOPS_LEVEL = 50  # points, used when the broker reports 0 (no fixed limit)
+
+# symbol_info().filling_mode flags
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+
+def _filling_modes(flags):
+    """Filling modes the symbol allows, in order of preference."""
+    modes = []
+    if flags & SYMBOL_FILLING_IOC:
+        modes.append(mt5.ORDER_FILLING_IOC)
+    if flags & SYMBOL_FILLING_FOK:
+        modes.append(mt5.ORDER_FILLING_FOK)
+    return modes or [mt5.ORDER_FILLING_RETURN]
+
+
+class SymbolConstraints:
+    """Per-symbol trading constraints loaded once and refreshed on a slow cadence."""
+
+    def __init__(self, refresh_interval=REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.table = {}
+
+    def load(self, symbol):
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            return None
+        if not info.visible and not mt5.symbol_select(symbol, True):
+            logger.error(f"Failed to select symbol {symbol}")
+            return None
+
+        stops_level = info.stops_level or DEFAULT_STOPS_LEVEL
+        filling_modes = _filling_modes(info.filling_mode)
+        entry = {
+            "symbol": symbol,
+            "point": info.point,
+            "digits": info.digits,
+            "stops_level": stops_level,
+            "min_stop_distance": stops_level * info.point,
+            "contract_size": info.trade_contract_size,
+            "tick_size": info.trade_tick_size or info.point,
+            "tick_value": info.trade_tick_value,
+            "volume_step": info.volume_step,
+            "volume_min": info.volume_min,
+            "volume_max": info.volume_max,
+            "filling_mode": filling_modes[0],
+            "filling_modes": filling_modes,
+            "loaded_at": time.monotonic(),
+        }
+        self.table[symbol] = entry
+        return entry
+
+    def get(self, symbol):
+        """Cached constraints for symbol, or None if the symbol is not available."""
+        entry = self.table.get(symbol)
+        if entry is None or time.monotonic() - entry["loaded_at"] > self.refresh_interval:
+            entry = self.load(symbol) or entry
+        return entry
+
+    def invalidate(self, symbol=None):
+        if symbol is None:
+            self.table.clear()
+        else:
+            self.table.pop(symbol, None)
+
+
+CONSTRAINTS = SymbolConstraints()
+
+
+def get_constraints(symbol):
+    return CONSTRAINTS.get(symbol)
+
+
+# --- SL/TP helpers shared by every order path ---
+
+def min_distance(constraints, min_points=None):
+    """Minimum stop distance in price units: broker limit or min_points, whichever is larger."""
+    distance = constraints["min_stop_distance"]
+    if min_points is not None:
+        distance = max(distance, min_points * constraints["point"])
+    return distance
+
+
+def adjust_stops(constraints, direction, price, sl, tp, min_points=None):
+    """Push SL/TP out to the minimum distance when they are too close to price."""
+    distance = min_distance(constraints, min_points)
+    sign = 1 if direction == "BUY" else -1
+    if abs(tp - price) < distance:
+        tp = price + sign * distance
+    if abs(price - sl) < distance:
+        sl = price - sign * distance
+    return sl, tp
+
+
+def offset_stops(constraints, direction, price, sl_points, tp_points):
+    """SL/TP at fixed point offsets from price, never closer than the broker allows."""
+    point = constraints["point"]
+    distance = constraints["min_stop_distance"]
+    sign = 1 if direction == "BUY" else -1
+    sl = price - sign * max(sl_points * point, distance)
+    tp = price + sign * max(tp_points * point, distance)
+    return sl, tp
+
+
+def stops_valid(constraints, direction, price, sl, tp, min_points=None):
+    """True if SL and TP are on the right side of price and far enough from it."""
+    distance = min_distance(constraints, min_points)
+    sign = 1 if direction == "BUY" else -1
+    return sign * (price - sl) >= distance and sign * (tp - price) >= distance
@@ -0,0 +1,190 @@
+import MetaTrader5 as mt5
+import numpy as np
+import threading
+import time
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAME_SECONDS = {
+    "M1": 60,
+    "M5": 5 * 60,
+    "M15": 15 * 60,
+    "M30": 30 * 60,
+    "H1": 60 * 60,
+    "H4": 4 * 60 * 60,
+    "D1": 24 * 60 * 60,
+}
+
+TICK_DTYPE = np.dtype([
+    ("time_msc", "i8"),
+    ("bid", "f8"),
+    ("ask", "f8"),
+    ("volume", "f8"),
+])
+
+TICK_BUFFER_SIZE = 100_000
+POLL_INTERVAL = 0.25  # seconds
+MAX_TICKS_PER_POLL = 10_000
+
+
+class TickRingBuffer:
+    """Fixed-size circular buffer of ticks for one symbol."""
+
+    def __init__(self, capacity=TICK_BUFFER_SIZE):
+        self.data = np.zeros(capacity, dtype=TICK_DTYPE)
+        self.capacity = capacity
+        self.count = 0
+        self.head = 0  # next write position
+
+    def append(self, time_msc, bid, ask, volume=0.0):
+        self.data[self.head] = (time_msc, bid, ask, volume)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def last_time_msc(self):
+        if self.count == 0:
+            return 0
+        return int(self.data[self.head - 1]["time_msc"])
+
+    def latest(self, n=None):
+        """Return the last n ticks in chronological order (copy)."""
+        n = self.count if n is None else min(n, self.count)
+        idx = (self.head - n + np.arange(n)) % self.capacity
+        return self.data[idx]
+
+
+class BarAggregator:
+    """Builds OHLC bars for one symbol/timeframe from a stream of ticks."""
+
+    def __init__(self, symbol, tf_name):
+        self.symbol = symbol
+        self.tf_name = tf_name
+        self.seconds = TIMEFRAME_SECONDS[tf_name]
+        self.bar = None
+
+    def update(self, time_msc, bid, ask):
+        """Add a tick. Returns the bar that just closed, or None."""
+        bar_time = (time_msc // 1000) // self.seconds * self.seconds
+        spread = ask - bid
+        closed = None
+
+        if self.bar is not None and bar_time > self.bar["time"]:
+            closed = self.bar
+            self.bar = None
+
+        if self.bar is None:
+            self.bar = {
+                "time": bar_time,
+                "open": bid,
+                "high": bid,
+                "low": bid,
+                "close": bid,
+                "tick_volume": 1,
+                "spread": spread,
+                "real_volume": 0,
+            }
+        else:
+            self.bar["high"] = max(self.bar["high"], bid)
+            self.bar["low"] = min(self.bar["low"], bid)
+            self.bar["close"] = bid
+            self.bar["tick_volume"] += 1
+            self.bar["spread"] = max(self.bar["spread"], spread)
+
+        return closed
+
+
+class MT5TickSource:
+    """Reads new ticks from the terminal since the last seen timestamp."""
+
+    def fetch(self, symbol, since_msc):
+        if since_msc:
+            # MT5 interprets datetimes as UTC: pass the start as UTC-aware
+            ticks = mt5.copy_ticks_from(symbol, datetime.fromtimestamp(since_msc / 1000, tz=timezone.utc),
+                                        MAX_TICKS_PER_POLL, mt5.COPY_TICKS_ALL)
+            if ticks is not None and len(ticks) > 0:
+                ticks = ticks[ticks["time_msc"] > since_msc]
+                if len(ticks) > 0:
+                    return [(int(t["time_msc"]), float(t["bid"]), float(t["ask"]), float(t["volume"]))
+                            for t in ticks]
+            # Nothing newer in the history yet: fall back to the current tick
+
+        tick = mt5.symbol_info_tick(symbol)
+        if tick is None or tick.time_msc <= since_msc:
+            return []
+        return [(tick.time_msc, tick.bid, tick.ask, float(tick.volume))]
+
+
+class SimulatedTickSource:
+    """Random-walk tick generator for running the feed without a terminal."""
+
+    def __init__(self, start_prices, spread=0.0002, volatility=0.0001, seed=None):
+        self.prices = dict(start_prices)
+        self.spread = spread
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+
+    def fetch(self, symbol, since_msc):
+        now_msc = int(time.time() * 1000)
+        if now_msc <= since_msc:
+            return []
+        price = self.prices[symbol] * (1 + self.rng.normal(0, self.volatility))
+        self.prices[symbol] = price
+        return [(now_msc, price, price * (1 + self.spread), 0.0)]
+
+
+class TickFeed:
+    """Polls ticks into per-symbol ring buffers and emits bar-close events.
+
+    `timeframes` maps each symbol to the list of timeframe names to build.
+    Subscribers are called as `callback(symbol, tf_name, bar)` on the polling
+    thread every time a bar closes.
+    """
+
+    def __init__(self, timeframes, source=None, poll_interval=POLL_INTERVAL):
+        self.source = source or MT5TickSource()
+        self.poll_interval = poll_interval
+        self.buffers = {symbol: TickRingBuffer() for symbol in timeframes}
+        self.aggregators = {
+            symbol: [BarAggregator(symbol, tf) for tf in tfs]
+            for symbol, tfs in timeframes.items()
+        }
+        self.subscribers = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def poll(self):
+        """Fetch pending ticks once for every symbol."""
+        for symbol, buffer in self.buffers.items():
+            for time_msc, bid, ask, volume in self.source.fetch(symbol, buffer.last_time_msc()):
+                buffer.append(time_msc, bid, ask, volume)
+                for aggregator in self.aggregators[symbol]:
+                    closed = aggregator.update(time_msc, bid, ask)
+                    if closed is not None:
+                        self._emit(symbol, aggregator.tf_name, closed)
+
+    def _emit(self, symbol, tf_name, bar):
+        for callback in self.subscribers:
+            try:
+                callback(symbol, tf_name, bar)
+            except Exception:
+                logger.exception(f"Bar-close handler failed for {symbol} ({tf_name})")
+
+    def run(self):
+        """Poll until stop() is called."""
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="tick-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
@@ -0,0 +1,26 @@
+import csv
+import os
+import threading
+from datetime import datetime
+
+JOURNAL_FILE = "logs/trade_journal.csv"
+FIELDS = ["datetime", "strategy", "mode", "symbol", "event", "direction", "volume", "price", "sl", "tp", "pnl", "comment"]
+
+
+class TradeJournal:
+    """Append-only CSV journal of live and simulated fills, one row per open or close."""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(FIELDS)
+
+    def record(self, strategy, mode, symbol, event, direction, volume, price, sl=None, tp=None, pnl=None, comment=""):
+        row = [datetime.now().strftime("%Y-%m-%d %H:%M:%S"), strategy, mode, symbol, event, direction,
+               volume, price, sl, tp, pnl, comment]
+        with self.lock:
+            with open(self.path, "a", newline="") as f:
+                csv.writer(f).writerow(row)